@@ -0,0 +1,97 @@
+"""
+    Shared HTTP session used by the REDCap export scripts.
+
+    Reusing a single requests.Session keeps the connection to the REDCap server alive between calls,
+    so chained exports pay for DNS, TCP and TLS setup once rather than on every request.
+"""
+
+import collections
+import requests
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+
+from config import config
+
+# Read once at import so each export reuses them instead of re-reading config per request
+TOKEN = config["api_token"]
+URL = config["api_url"]
+
+# Concurrent exports share the pool; it holds one keep-alive connection per worker so no request
+# has to open (and then throw away) an extra connection when all pooled ones are busy.
+MAX_WORKERS = config.get("max_workers", 8)
+
+# (connect, read) seconds; the read timeout bounds each wait for data, so a wedged connection fails and is retried
+TIMEOUT = (config.get("connect_timeout", 5.0), config.get("read_timeout", 120.0))
+
+# The REDCap API only takes POST and these scripts only export, so POSTs are safe to retry on connection errors,
+# timeouts and the throttling/server error statuses (urllib3 skips POST unless told otherwise).  Once the tries run
+# out the last response is returned rather than raised, so its HTTP status and body are still reported.
+_ADAPTER = HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=MAX_WORKERS,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"POST"},
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    ),
+)
+
+SESSION = requests.Session()
+SESSION.mount("https://", _ADAPTER)
+SESSION.mount("http://", _ADAPTER)
+
+# CSV/JSON exports compress well, so always ask for a compressed body.  urllib3 lists only the encodings it can
+# decode here (gzip and deflate, plus br/zstd when brotli/zstandard are installed); iter_content decodes on the fly.
+SESSION.headers["Accept-Encoding"] = make_headers(accept_encoding=True)["accept-encoding"]
+
+
+def stream_to(r, out, chunk_size=1 << 16):
+    """
+        Copy the body of a response opened with stream=True to the binary file object out, chunk by chunk,
+        without decoding it to str.  iter_content also undoes any gzip/deflate content encoding.
+    """
+    for chunk in r.iter_content(chunk_size):
+        out.write(chunk)
+
+
+class RateLimiter:
+    """
+        Allows at most max_rate calls per period (in seconds) across threads; a caller blocks until a slot frees up.
+        Keeps concurrent exports under the REDCap server rate limit instead of tripping 429 responses and retrying.
+
+        Usage:
+            limiter = RateLimiter(10, 1.0)
+            with limiter:
+                r = SESSION.post(...)
+    """
+
+    def __init__(self, max_rate, period=1.0):
+        self.max_rate = max_rate
+        self.period = period
+        self._calls = collections.deque()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+
+                if len(self._calls) < self.max_rate:
+                    self._calls.append(now)
+                    return self
+
+                wait = self.period - (now - self._calls[0])
+
+            time.sleep(wait)
+
+    def __exit__(self, *exc_info):
+        return False
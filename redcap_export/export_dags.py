@@ -1,15 +1,13 @@
 #!/usr/bin/env python
 #Exports the REDCap data admin groups for populating organization and access group tables; format can be csv or json. 
+# The POST fields are defined in JOBS['dags'] in run_all.py.
 
-from config import config
-import requests
+from run_all import print_export
 
-fields = {
-    'token': config['api_token'],
-    'content': 'dag',
-    'format': 'csv'
-}
 
-r = requests.post(config['api_url'],data=fields)
-print('HTTP Status: ' + str(r.status_code))
-print(r.text)
+def main():
+    print_export('dags')
+
+
+if __name__ == '__main__':
+    main()
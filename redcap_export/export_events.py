@@ -1,16 +1,13 @@
 #!/usr/bin/env python
 #Exports list of REDCap events for populating protocol/event_type tables.
+# The POST fields are defined in JOBS['events'] in run_all.py.
 
-from config import config
-import requests
+from run_all import print_export
 
-fields = {
-    'token': config['api_token'],
-    'content': 'event',
-    'format': 'csv',
-    'arms': ''
-}
 
-r = requests.post(config['api_url'],data=fields)
-print('HTTP Status: ' + str(r.status_code))
-print(r.text)
+def main():
+    print_export('events')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,13 @@
 #!/usr/bin/env python
 #Exports REDCap fieldnames including an expanded list of ennumerated checkbox fields 
+# The POST fields are defined in JOBS['field_names'] in run_all.py.
 
-from config import config
-import requests
+from run_all import print_export
 
-fields = {
-    'token': config['api_token'],
-    'content': 'exportFieldNames',
-    'format': 'csv',
-    'returnFormat': 'csv'
-}
 
-r = requests.post(config['api_url'],data=fields)
-print('HTTP Status: ' + str(r.status_code))
-print(r.text)
+def main():
+    print_export('field_names')
+
+
+if __name__ == '__main__':
+    main()
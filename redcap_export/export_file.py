@@ -1,20 +1,37 @@
 #!/usr/bin/env python
+# Exports the file described by JOBS['file'] in run_all.py to /tmp/export.raw.txt.
 
-from config import config
-import requests
+import os
 
-fields = {
-    'token': config['api_token'],
-    'content': 'file',
-    'action': 'export',
-    'record': 'f21a3ffd37fc0b3c',
-    'field': 'file_upload',
-    'event': 'event_1_arm_1'
-}
+from run_all import open_export
 
-r = requests.post(config['api_url'],data=fields)
-print('HTTP Status: ' + str(r.status_code))
 
-f = open('/tmp/export.raw.txt', 'wb')
-f.write(r.content)
-f.close()
+def main():
+    path = '/tmp/export.raw.txt'
+
+    # Stream the file to disk in 1 MiB chunks rather than holding the whole download in memory
+    with open_export('file') as r:
+        print('HTTP Status: ' + str(r.status_code))
+        r.raise_for_status()
+
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            # Reserve the whole file up front when its size is known, so the filesystem allocates it once instead of
+            # extending it on every write.  The Content-Length of a gzip/deflate encoded body is not the decoded size.
+            size = int(r.headers.get('Content-Length', 0))
+            if size and 'Content-Encoding' not in r.headers and hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(fd, 0, size)
+                except OSError:
+                    pass  # not supported by this filesystem
+
+            for chunk in r.iter_content(1 << 20):
+                view = memoryview(chunk)
+                while view:
+                    view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,13 @@
 #!/usr/bin/env python
 #Similar to export_records, returns records added, updated or deleted from beginTime to endTime
+# The POST fields are defined in JOBS['logging'] in run_all.py.
 
-from config import config
-import requests
+from run_all import print_logging_export
 
-fields = {
-    'token': config['api_token'],
-    'content': 'log',
-    'format': 'csv',
-    'logtype': 'record',
-    'user': '',
-    'record': '',
-    'beginTime': '2020-06-23 14:45',
-    'endTime': '',
-    'returnFormat': 'csv'
-}
 
-r = requests.post(config['api_url'],data=fields)
-print('HTTP Status: ' + str(r.status_code))
-print(r.text)
\ No newline at end of file
+def main():
+    print_logging_export()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,13 @@
 #!/usr/bin/env python
 #Export format can be set to csv or json.
+# The POST fields are defined in JOBS['metadata'] in run_all.py.
 
-from config import config
-import requests
+from run_all import print_export
 
-fields = {
-    'token': config['api_token'],
-    'content': 'metadata',
-    'format': 'csv',
-    'returnFormat': 'csv'
-}
 
-r = requests.post(config['api_url'],data=fields)
-print('HTTP Status: ' + str(r.status_code))
-print(r.text)
+def main():
+    print_export('metadata')
 
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,13 @@
 #!/usr/bin/env python
 
-# Export all records that have been added or changed since dateRangeBegin; format may be 'csv' or 'json'. If json, lines 14-17 and 22 should be commented out.  
+# Export all records that have been added or changed since dateRangeBegin; format may be 'csv' or 'json'. If json, drop the csv-only fields from JOBS['records'] in run_all.py.  
 
-from config import config
-import requests
+from run_all import print_export
 
-fields = {
-    'token': config['api_token'],
-    'content': 'record',
-    'action': 'export',
-    'format': 'csv',
-    'type': 'flat',
-    'csvDelimiter': '',
-    'rawOrLabel': 'raw',
-    'rawOrLabelHeaders': 'raw',
-    'exportCheckboxLabel': 'false',
-    'exportSurveyFields': 'true',
-    'exportDataAccessGroups': 'true',
-    'returnFormat': 'csv',
-    'dateRangeBegin': '2022-06-08 00:00:00',
-    'exportBlankForGrayFormStatus': 'true'
-}
-r = requests.post(config['api_url'],data=fields)
-print('HTTP Status: ' + str(r.status_code))
-print(r.text)
+
+def main():
+    print_export('records')
+
+
+if __name__ == '__main__':
+    main()
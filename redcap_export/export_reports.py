@@ -3,23 +3,15 @@
 #Save the returned data to a file within the CTRN VM rc_export directory /rc_export/[report_name]_DATA_[export_date]_[hhmm].csv
 #An example filename for a REDCap report download is "TexasChildhoodTrauma-SchererTesicsp_DATA_2022-06-09_1442.csv" 
 
-from config import config
-import requests
+# Every report_id in the first column of ctrn_report_ids.csv (or config['report_ids_csv']) is exported concurrently
+# by run_all.py; report 4792 is exported when no such CSV is present.  The POST fields are in JOBS['reports'].
 
-fields = {
-    'token': config['api_token'],
-    'content': 'report',
-    'format': 'csv',
-    'report_id': '4792',
-    'csvDelimiter': '',
-    'rawOrLabel': 'raw',
-    'rawOrLabelHeaders': 'raw',
-    'exportCheckboxLabel': 'false',
-    'returnFormat': 'csv'
-}
+from run_all import run
 
-r = requests.post(config['api_url'],data=fields)
-print('HTTP Status: ' + str(r.status_code))
-print(r.text)
 
+def main():
+    run(['reports'])
 
+
+if __name__ == '__main__':
+    main()
@@ -3,63 +3,411 @@
 
     Note that the methods using self._core_api_code may return False to other instance methods
     in the event of a connection failure, in lieu of an expected response.
+
+    Export responses can be reused between calls by setting cache_ttl (seconds), e.g.
+    Redcapy(api_token=token, redcap_url=url, cache_ttl=300).  Pass bypass_cache=True to an export_* method to
+    refresh that one export, or call clear_cache() to force fresh exports.
 """
 
 import attr
+import hashlib
+import html
+import io
+import ipaddress
 import json
+import logging
+import os
+import random
 import re
 import requests
+import threading
 import time
 
-from bs4 import BeautifulSoup
-from collections import namedtuple
+from collections import OrderedDict, namedtuple
+from copy import deepcopy
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from functools import wraps
-from validator_collection import checkers
+from itertools import islice
+from requests.adapters import HTTPAdapter
+from types import MappingProxyType
+from urllib.parse import urlsplit
+from urllib3.fields import RequestField
+from urllib3.filepost import choose_boundary
+from urllib3.util.retry import Retry
+
+try:
+    import orjson  # parses and dumps record JSON several times faster than the stdlib json module
+
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj):
+        return orjson.dumps(obj).decode()
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
+try:
+    import ijson  # parses streamed record exports incrementally
+except ImportError:
+    ijson = None
+
+_logger = logging.getLogger(__name__)
+
+# Redcap reports errors in XML responses as <hash><error>message</error></hash>
+_ERROR_RE = re.compile(r"<error>(.*?)</error>", re.DOTALL)
+
+# $-_ is the range $ through _, which takes in digits, upper case letters and the URL punctuation : / ? = #
+_URL_RE = re.compile(r"http[s]?://(?:[a-zA-Z0-9$-_@.&+!*(),]|%[0-9a-fA-F]{2})+")
+
+
+# A host name of dot separated labels of letters, digits and inner hyphens, which also covers IPv4 addresses
+_HOSTNAME_RE = re.compile(r"(?!-)[A-Za-z0-9-]{1,63}(?<!-)(?:\.(?!-)[A-Za-z0-9-]{1,63}(?<!-))*\.?\Z")
+
+# Failures worth retrying: the server was unreachable, timed out, cut the response short or is throttling/unwell
+_RECOVERABLE_EXCEPTIONS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+_RECOVERABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Connections kept open to the Redcap server per instance, and so the most concurrent requests worth making
+_POOL_MAXSIZE = 16
+
+# Names of the cache_dir entries _core_api_code writes: a sha256 hex digest, or one being written
+_CACHE_FILE_RE = re.compile(r"[0-9a-f]{64}(?:\.\d+\.\d+\.tmp)?\Z")
+
+# Distinct export_records(use_cache=True) responses kept in memory per instance; the least recently used is dropped
+_EXPORT_CACHE_MAXSIZE = 32
+
+
+def _is_url(value):
+    # An http(s) URL with a well formed host and, if given, port
+    try:
+        parts = urlsplit(value)
+        parts.port
+    except ValueError:
+        return False
+
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return False
+
+    if ":" in parts.hostname:
+        try:
+            ipaddress.IPv6Address(parts.hostname)
+        except ValueError:
+            return False
+        return True
+
+    return bool(_HOSTNAME_RE.match(parts.hostname))
+
+
+def _retry_after_secs(response):
+    # Seconds asked for by a Retry-After header (delta seconds or an HTTP date) on a 429/503 response, else 0
+    retry_after = getattr(response, "headers", {}).get("Retry-After")
+    if not retry_after:
+        return 0
+
+    # Delta seconds are a whole number; float() would also take "nan" and "inf", which time.sleep rejects
+    try:
+        return max(int(retry_after), 0)
+    except ValueError:
+        pass
+
+    try:
+        return max((parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds(), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _mask_token(token, begin_show_chars=3, end_show_chars=2):
+    # api_token is shown masked when an instance is revealed with __repr__
+    return token[:begin_show_chars] + "***...***" + token[-end_show_chars:]
+
+
+# Returned by Redcapy._check_args; defined once rather than on every API call
+_CheckedArgs = namedtuple("ARGS", "limit wait_secs")
+
+
+class _MultipartBody:
+    """
+        multipart/form-data request body of the form fields plus one file part, read from the open file while it
+        is sent instead of being assembled in memory the way requests' files= argument does.  Its length is known
+        up front, so the upload goes out with a Content-Length rather than chunked.
+    """
+
+    def __init__(self, fields, name, f, filename, boundary=None):
+        boundary = boundary or choose_boundary()
+        self.content_type = "multipart/form-data; boundary=" + boundary
+
+        head = b""
+        for field_name, value in self._field_items(fields):
+            head += self._part_header(boundary, RequestField(field_name, value)) + value + b"\r\n"
+
+        head += self._part_header(boundary, RequestField(name, b"", filename=filename))
+        tail = "\r\n--{}--\r\n".format(boundary).encode()
+
+        self._parts = [io.BytesIO(head), f, io.BytesIO(tail)]
+        self._length = len(head) + os.fstat(f.fileno()).st_size - f.tell() + len(tail)
+
+    @staticmethod
+    def _field_items(fields):
+        # (name, bytes value) pairs the way requests encodes data= next to files=: a list or tuple value becomes
+        # one part per item and None values are left out, e.g. no event part for a non-longitudinal project
+        for field_name, values in fields.items():
+            if isinstance(values, (str, bytes)) or not hasattr(values, "__iter__"):
+                values = [values]
+
+            for value in values:
+                if value is not None:
+                    yield field_name, value if isinstance(value, bytes) else str(value).encode()
+
+    @staticmethod
+    def _part_header(boundary, field):
+        field.make_multipart()
+        return "--{}\r\n".format(boundary).encode() + field.render_headers().encode()
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        chunks = []
+
+        while self._parts and size != 0:
+            chunk = self._parts[0].read(size)
+            if not chunk:
+                self._parts.pop(0)
+                continue
+
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+
+        return b"".join(chunks)
+
+
+class _RecoverableError(Exception):
+    """
+        Raised by _core_api_code for a failure that may succeed if the call is retried
+    """
+
+
+class _TTLCache:
+    """
+        Thread safe in-memory cache of API responses keyed on their POST data, dropping the least recently used
+        beyond maxsize.  Callers only set successful responses, so errors and connection failures are retried on
+        the next call.  Copies go in and out, so a caller changing its response never changes the cached one.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # frozenset of POST items -> (time.monotonic() when set, response)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(post_data):
+        # None when a value is unhashable, such as fields=[...]; that call is neither looked up nor stored
+        try:
+            return frozenset(post_data.items())
+        except TypeError:
+            return None
+
+    def get(self, post_data, ttl):
+        # A copy of the response set for post_data within ttl secs, or None
+        key = self._key(post_data)
+
+        with self._lock:
+            cached = self._entries.get(key) if key is not None else None
+            if cached and time.monotonic() - cached[0] < ttl:
+                self._entries.move_to_end(key)
+                return deepcopy(cached[1])
+
+        return None
+
+    def set(self, post_data, response):
+        key = self._key(post_data)
+        if key is None:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), deepcopy(response))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
 
 
 @attr.s
 class Redcapy:
     # Instance vars
-    api_token = attr.ib(validator=attr.validators.instance_of(str))
-    _redcap_token = ""  # later copies api_token value as private var
+    api_token = attr.ib(validator=attr.validators.instance_of(str), repr=lambda token: repr(_mask_token(token)))
     redcap_url = attr.ib(validator=attr.validators.instance_of(str))
+    # Seconds to reuse export responses cached under cache_dir; 0 disables the cache
+    cache_ttl = attr.ib(default=0, validator=attr.validators.instance_of((int, float)))
+    cache_dir = attr.ib(default=".redcapy_cache", validator=attr.validators.instance_of(str))
     last_status_code = ""
     last_response = ""
     retry_keys = ["limit", "wait_secs", "backoff", "logger"]  # Used by retry decorator
+    export_contents = ["event", "metadata", "surveyLink", "participantList", "record"]  # Cacheable with cache_ttl
+
+    # POST fields each endpoint accepts as kwargs
+    _EXPORT_EVENTS_KEYS = frozenset(["token", "content", "format", "arms", "returnFormat"] + retry_keys)
+    _EXPORT_DATA_DICTIONARY_KEYS = frozenset(
+        ["token", "content", "format", "fields", "forms", "returnFormat"] + retry_keys
+    )
+    _EXPORT_SURVEY_LINK_KEYS = frozenset(["token", "content", "format", "returnFormat"] + retry_keys)
+    _EXPORT_SURVEY_PARTICIPANTS_KEYS = frozenset(["token", "content", "format", "returnFormat"] + retry_keys)
+    _EXPORT_RECORDS_KEYS = frozenset(
+        [
+            "fields",
+            "forms",
+            "events",
+            "records",
+            "token",
+            "content",
+            "format",
+            "type",
+            "rawOrLabel",
+            "rawOrLabelHeaders",
+            "exportCheckboxLabel",
+            "exportSurveyFields",
+            "exportDataAccessGroups",
+            "returnFormat",
+        ]
+        + retry_keys
+    )
+    _IMPORT_RECORDS_KEYS = frozenset(
+        [
+            "token",
+            "content",
+            "format",
+            "type",
+            "overwriteBehavior",
+            "data",
+            "dateFormat",
+            "returnContent",
+            "returnFormat",
+        ]
+        + retry_keys
+    )
+    _DELETE_RECORD_KEYS = frozenset(["token", "content", "records[0]", "arm"] + retry_keys)
+    _DELETE_FORM_KEYS = frozenset(
+        ["token", "content", "action", "records[0]", "field", "event", "repeat_instance"] + retry_keys
+    )
+    _IMPORT_FILE_KEYS = frozenset(
+        ["token", "content", "format", "action", "record", "field", "event", "returnContent", "file"] + retry_keys
+    )
+
+    # Default POST fields for each endpoint, minus the token and per-call values; copied into post_data per call
+    _EXPORT_EVENTS_POST_DATA = MappingProxyType({"content": "event", "format": "json", "returnFormat": "json"})
+    _EXPORT_DATA_DICTIONARY_POST_DATA = MappingProxyType(
+        {"content": "metadata", "format": "json", "returnFormat": "json"}
+    )
+    _EXPORT_SURVEY_LINK_POST_DATA = MappingProxyType(
+        {"content": "surveyLink", "format": "json", "returnFormat": "json"}
+    )
+    _EXPORT_SURVEY_PARTICIPANTS_POST_DATA = MappingProxyType(
+        {"content": "participantList", "format": "json", "returnFormat": "json"}
+    )
+    _EXPORT_RECORDS_POST_DATA = MappingProxyType(
+        {
+            "content": "record",
+            "format": "json",
+            "type": "flat",
+            "rawOrLabel": "raw",
+            "rawOrLabelHeaders": "raw",
+            "exportCheckboxLabel": "false",
+            "exportSurveyFields": "false",
+            "exportDataAccessGroups": "false",
+            "returnFormat": "json",
+        }
+    )
+    _IMPORT_RECORDS_POST_DATA = MappingProxyType(
+        {
+            "content": "record",
+            "format": "json",
+            "type": "flat",
+            "overwriteBehavior": "normal",
+            "dateFormat": "YMD",
+            "returnContent": "count",
+            "returnFormat": "json",
+        }
+    )
+    _DELETE_RECORD_POST_DATA = MappingProxyType({"action": "delete", "content": "record"})
+    _DELETE_FORM_POST_DATA = MappingProxyType({"content": "file", "action": "delete"})
+    _IMPORT_FILE_POST_DATA = MappingProxyType(
+        {"content": "file", "format": "json", "action": "import", "returnFormat": "json"}
+    )
 
     @api_token.validator
-    def check_and_mask_token(self, attribute, value):
+    def check_token(self, attribute, value):
         if not self.api_token:
             raise ValueError("Must provide token to initialize Redcapy instance")
-        else:
-            begin_show_chars = 3
-            end_show_chars = 2
-
-            # Swap tokens such that api_token is masked when revealed with __repr__ and using
-            # instead private attribute _redcap_token as the actual token
-            self._redcap_token = self.api_token
-            self.api_token = (
-                self._redcap_token[:begin_show_chars]
-                + "***...***"
-                + self._redcap_token[-end_show_chars:]
-            )
+
+    @property
+    def _redcap_token(self):
+        # Former name of the unmasked token, kept for existing callers
+        return self.api_token
 
     @redcap_url.validator
     def check_url(self, attribute, value):
-        if not checkers.is_url(self.redcap_url):
+        if not _is_url(self.redcap_url):
             msg = 'Invalid URL format detected for "{}" when initializing Redcapy instance'.format(
                 self.redcap_url
             )
             raise ValueError(msg)
 
+    def __attrs_post_init__(self):
+        # One keep-alive session per instance, shared by every endpoint (exports, imports, file and form deletes),
+        # so repeated API calls reuse the connection (and TLS session) to the Redcap server.
+        # The adapter only retries failures to connect, quickly and before anything was sent, so even imports
+        # are safe to resend.  Throttling/server error statuses and dropped connections are left to the retry
+        # decorator's longer, jittered backoff, so the two never multiply each other's attempts.
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=_POOL_MAXSIZE,
+            max_retries=Retry(total=None, connect=2, read=0, status=0, other=0, redirect=0, backoff_factor=0.5),
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+        # Added 'identity' value to override default use of gzip and deflate, which can cause requests module
+        # to fail in the apparent presence of improper data in the Redcap project.
+        self._session.headers.update({"Accept-Encoding": "identity"})
+
+        # export_records(use_cache=True) responses
+        self._export_cache = _TTLCache(_EXPORT_CACHE_MAXSIZE)
+
+        # time.monotonic() when expired cache_dir entries were last removed
+        self._cache_pruned = float("-inf")
+
     def __call__(self, *args, **kwargs):
         return self
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+            Close the pooled connections to the Redcap server
+        """
+        self._session.close()
+
     class _Decorators:
         @classmethod
-        def retry(cls, exceptions, limit=4, wait_secs=3, backoff=2, logger=None):
+        def retry(cls, exceptions, limit=4, wait_secs=3, backoff=2, max_delay=30, jitter=0.5, logger=None):
             """
-                Retry calling the decorated function using an exponential backoff.
+                Retry calling the decorated function using an exponential backoff when it raises one of exceptions.
+                Other failures, which the function reports by returning False, are not retried.
 
                 Ref: Adapted from https://www.calazan.com/retry-decorator-for-python-3/
                     and https://medium.com/@vadimpushtaev/decorator-inside-python-class-1e74d23107f6
@@ -69,6 +417,9 @@ class Redcapy:
                 :param limit: Number of times to try (not retry) before giving up.
                 :param wait_secs: Initial delay between retries in seconds.
                 :param backoff: Backoff multiplier (e.g. value of 2 will double the delay each retry).
+                :param max_delay: Longest delay in seconds the backoff grows to, before jitter.
+                :param jitter: Each delay is stretched by a random 0 to jitter fraction, so clients that failed
+                    together do not all retry at the same moment.  A longer Retry-After from the server wins.
                 :param logger: Logger to use. If None, print.
             """
 
@@ -76,69 +427,63 @@ class Redcapy:
             def deco_retry(f):
                 @wraps(f)
                 def f_retry_wrapper(other_self, **kwargs):
-                    # mtries, mdelay = tries, delay
                     post_data = kwargs.get("post_data", {})
                     import_file = kwargs.get("import_file", False)
                     delete_file = kwargs.get("delete_file", False)
                     opt_post_data_kvpairs = kwargs.get("opt_post_data_kvpairs", None)
+                    bypass_cache = kwargs.get("bypass_cache", False)
 
                     mtries = kwargs.get("limit", limit)
                     mdelay = kwargs.get("wait_secs", wait_secs)
                     # mbackoff = kwargs.get('backoff', backoff)
 
-                    while mtries > 1:
+                    for attempt in range(mtries, 0, -1):
                         try:
                             print("Attempting API connection...")
-                            rv = f(
+                            return f(
                                 other_self,
                                 post_data=post_data,
                                 import_file=import_file,
                                 delete_file=delete_file,
                                 opt_post_data_kvpairs=opt_post_data_kvpairs,
-                                limit=mtries,
+                                bypass_cache=bypass_cache,
+                                limit=attempt,
                                 wait_secs=mdelay,
                             )
+                        except exceptions:
+                            if attempt == 1:
+                                break
 
-                            if isinstance(rv, bool) and not rv:
-                                raise Exception
-
-                            return rv
-                        except (exceptions, Exception):
-                            mtries -= 1
+                            delay = max(
+                                min(mdelay, max_delay) * (1 + random.random() * jitter),
+                                _retry_after_secs(other_self.last_response),
+                            )
 
-                            msg = "Up to {} attempt(s) remaining. Retrying in {} seconds...".format(
-                                mtries, mdelay
+                            msg = "Up to {} attempt(s) remaining. Retrying in {:.1f} seconds...".format(
+                                attempt - 1, delay
                             )
                             print(msg)
 
                             if logger:
                                 logger.warning(msg)
 
-                            time.sleep(mdelay)
+                            time.sleep(delay)
                             mdelay *= backoff
 
-                    return f(
-                        other_self,
-                        post_data=post_data,
-                        import_file=import_file,
-                        delete_file=delete_file,
-                        opt_post_data_kvpairs=opt_post_data_kvpairs,
-                        limit=mtries,
-                        wait_secs=mdelay,
-                    )
+                    return False
 
                 return f_retry_wrapper
 
             return deco_retry
-            print("Completed API connection attempt")
 
-    @_Decorators.retry(Exception)
+    @_Decorators.retry(_RecoverableError)
     def _core_api_code(
         self,
         post_data,
         import_file=False,
         delete_file=False,
         opt_post_data_kvpairs=None,
+        bypass_cache=False,
         **kwargs
     ):
         """
@@ -151,6 +496,8 @@ class Redcapy:
             :param import_file:  bool.  Set to True when the import_file method is being used (import_file
                     and delete_file cannot both be True)
             :param delete_file:  bool.  Set to True when the delete_file method is being used
+            :param bypass_cache:  bool.  Set to True to fetch an export from Redcap even when cache_ttl is set and
+                    a cached response exists; the fresh response replaces the cached one
 
             :return: One of several types, depending on the call. Check Redcap documentation for any given method.
                     Returns JSON containing either the expected output or an error message for most calls.
@@ -163,92 +510,133 @@ class Redcapy:
         self.last_status_code = ""
         self.last_response = ""
 
-        if opt_post_data_kvpairs is None:
-            opt_post_data_kvpairs = {}
+        # Raised rather than asserted, so the check still holds under python -O.  The message leaves out post_data,
+        # which holds the token.
+        if not isinstance(post_data, dict):
+            raise TypeError(
+                "post_data passed to core_api_code method expected a dict but received a {} object".format(
+                    type(post_data).__name__
+                )
+            )
 
-        assert isinstance(
-            post_data, dict
-        ), "{} passed to core_api_code method \
-            expected a dict but received a {} object".format(
-            post_data, type(post_data)
-        )
+        if opt_post_data_kvpairs:
+            post_data.update(opt_post_data_kvpairs)
 
-        if opt_post_data_kvpairs is not None:
-            for key, value in opt_post_data_kvpairs.items():
-                post_data[key] = value
+        cache_path = None
+        if self.cache_ttl and not (import_file or delete_file) and self._is_export(post_data):
+            # keyed on all POST fields, token included, so different projects or queries never share an entry
+            cache_key = json.dumps(post_data, sort_keys=True, default=str).encode()
+            cache_path = os.path.join(self.cache_dir, hashlib.sha256(cache_key).hexdigest())
 
-        try:
-            if import_file:
-                files = {"file": open(post_data["file"], "rb")}
+        return_value = self._read_cache(cache_path) if cache_path and not bypass_cache else None
 
-                r = requests.post(self.redcap_url, data=post_data, files=files)
-            else:
-                # Added 'identity' value to override default use of gzip and deflate, which can cause requests module
-                # to fail in the apparent presence of improper data in the Redcap project.
-                r = requests.post(
-                    self.redcap_url,
-                    data=post_data,
-                    headers={"Accept-Encoding": "identity"},
-                )
+        if return_value is not None:
+            self.last_status_code = 200
+        else:
+            try:
+                if import_file:
+                    # The local path is only needed to open the file, so it is not sent as a form field.  post_data
+                    # itself is left as is, as a retry posts it again.
+                    form_data = {key: value for key, value in post_data.items() if key != "file"}
+
+                    with open(post_data["file"], "rb") as f:
+                        body = _MultipartBody(form_data, "file", f, os.path.basename(post_data["file"]))
+                        r = self._session.post(
+                            self.redcap_url, data=body, headers={"Content-Type": body.content_type}
+                        )
+                else:
+                    r = self._session.post(self.redcap_url, data=post_data)
 
-            self.last_status_code = r.status_code
-            self.last_response = r
+                self.last_status_code = r.status_code
+                self.last_response = r
 
-            if (
-                r.status_code == 400
-                and json.loads(r.text)["error"]
-                == "There is no file to delete for this record"
-            ):
-                print(json.loads(r.text)["error"])
-                return True
-            elif r.status_code != 200:
-                msg = "Critical: Redcap server returned a {} status code. ".format(
-                    r.status_code
-                )
+                error = None
+                if r.status_code == 400:
+                    # Parsed once; a 400 body in XML or of another shape falls through to the error report below
+                    try:
+                        error = _json_loads(r.content).get("error")
+                    except (ValueError, AttributeError):
+                        pass
+
+                if error == "There is no file to delete for this record":
+                    print(error)
+                    return True
+                elif r.status_code != 200:
+                    msg = "Critical: Redcap server returned a {} status code. ".format(
+                        r.status_code
+                    )
 
-                try:
-                    return_soup = BeautifulSoup(str(r.text), "xml")
+                    xml_error = _ERROR_RE.search(r.text)
                     msg += "Error received from Redcap: {}".format(
-                        return_soup.hash.error.get_text()
+                        html.unescape(xml_error.group(1)) if xml_error else error or r.text
                     )
-                except Exception as e:
-                    msg += "Error received from Redcap: {}".format(r.text)
 
+                    print(msg)
+
+                    if r.status_code in _RECOVERABLE_STATUS_CODES:
+                        raise _RecoverableError(msg)
+
+                    return False
+            except _RecoverableError:
+                raise
+            except Exception as e:
+                msg = "Redcapy: Error received when connecting to Redcap using requests.post(). Error: {}".format(
+                    e
+                )
                 print(msg)
 
+                if isinstance(e, _RECOVERABLE_EXCEPTIONS):
+                    raise _RecoverableError(msg) from e
+
                 return False
-        except Exception as e:
-            msg = "Redcapy: Error received when connecting to Redcap using requests.post(). Error: {}".format(
-                e
-            )
-            print(msg)
-            return False
 
-        return_value = r.text
+            # Kept as bytes, so JSON goes straight to the parser without first being decoded to a str
+            return_value = r.content
 
-        # export_survey_link returns a URL as a str, so try this first
-        if return_value and isinstance(return_value, str):
-            if self._find_url(return_value) == return_value:
-                return return_value
+            if cache_path:
+                # Record exports are participant data, so the cache is readable by the current user only
+                os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+                tmp_path = "{}.{}.{}.tmp".format(cache_path, os.getpid(), threading.get_ident())
 
-        if delete_file and len(return_value) == 0:
-            return True
+                with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+                    f.write(return_value)
+                os.replace(tmp_path, cache_path)
 
-        if (len(return_value) > 0 and import_file) or not import_file:
-            try:
-                return json.loads(return_value)
-            except Exception as e:  # delete method on error returns xml
-                try:
-                    return_soup = BeautifulSoup(str(return_value), "xml")
-                    return return_soup.hash.error.get_text()
-                except Exception as e2:
-                    print(
-                        "Error: Data returned from Redcap was not a JSON nor XML object. Data: ",
-                        return_value,
-                    )
-                    return return_value
+                # At most once per cache_ttl, so a long run does not list cache_dir after every export
+                if time.monotonic() - self._cache_pruned > self.cache_ttl:
+                    self._cache_pruned = time.monotonic()
+                    self.clear_cache(expired_only=True)
+
+        if not return_value:
+            # import_file and delete_file return an empty body on success
+            if import_file or delete_file:
+                return True
+            return_value = ""
         else:
-            return True
+            # Pick the parser from the first character, so large JSON exports are never scanned for a URL
+            lead = return_value[:1] if not return_value[:1].isspace() else return_value.lstrip()[:1]
+
+            if lead == b"<":  # delete method on error returns xml
+                return_value = return_value.decode("utf-8", "replace")
+                error = _ERROR_RE.search(return_value)
+                if error:
+                    return html.unescape(error.group(1))
+            elif lead == b"h":
+                # export_survey_link returns a URL as a str
+                return_value = return_value.decode("utf-8", "replace")
+                if self._find_url(return_value) == return_value:
+                    return return_value
+            else:
+                try:
+                    return _json_loads(return_value)
+                except ValueError:
+                    return_value = return_value.decode("utf-8", "replace")
+
+        print(
+            "Error: Data returned from Redcap was not a JSON nor XML object. Data: ",
+            return_value,
+        )
+        return return_value
 
     def _api_error_handler(self, error_message):
         # TODO
@@ -257,6 +645,56 @@ class Redcapy:
             error_message,
         )
 
+    @staticmethod
+    def _update_post_data(post_data, kwargs, valid_keys):
+        # Copy the kwargs an endpoint accepts into post_data, and report the rest in a single warning
+        post_data.update((key, value) for key, value in kwargs.items() if key in valid_keys)
+
+        invalid_keys = kwargs.keys() - valid_keys
+        if invalid_keys:
+            _logger.warning("Ignored invalid key(s): %s", ", ".join(sorted(invalid_keys)))
+
+    def _is_export(self, post_data):
+        # Exports only read from Redcap; record imports carry a data field and deletes an action
+        return (
+            post_data.get("content") in self.export_contents
+            and "data" not in post_data
+            and post_data.get("action", "export") == "export"
+        )
+
+    def _read_cache(self, cache_path):
+        # The cached body, or None when there is no entry younger than cache_ttl
+        try:
+            if time.time() - os.path.getmtime(cache_path) < self.cache_ttl:
+                with open(cache_path, "rb") as f:
+                    return f.read()
+        except FileNotFoundError:  # never cached, or removed by clear_cache in another thread
+            pass
+        return None
+
+    def clear_cache(self, expired_only=False):
+        """
+            Remove the cached export responses, so the next export calls fetch fresh data from Redcap.
+            Only the entry files written by this class are removed, so cache_dir may be shared with other files.
+
+            :param expired_only: bool.  When True, only remove the entries older than cache_ttl and keep the rest
+        """
+        if os.path.isdir(self.cache_dir):
+            now = time.time()
+
+            for entry in os.scandir(self.cache_dir):
+                if not (_CACHE_FILE_RE.match(entry.name) and entry.is_file(follow_symlinks=False)):
+                    continue
+
+                try:
+                    if not expired_only or now - entry.stat().st_mtime >= self.cache_ttl:
+                        os.remove(entry.path)
+                except FileNotFoundError:  # already removed by another thread
+                    pass
+
+        if not expired_only:
+            self._export_cache.clear()
+
     @staticmethod
     def _find_url(str_to_parse):
         """
@@ -265,11 +703,8 @@ class Redcapy:
         :return: str, URL of the first URL found in the supplied str argument
         """
 
-        url_list = re.findall(
-            "http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]| [! *(),] | (?: %[0-9a-fA-F][0-9a-fA-F]))+",
-            str_to_parse,
-        )
-        return url_list[0] if len(url_list) > 0 else ""
+        url = _URL_RE.search(str_to_parse)
+        return url.group(0) if url else ""
 
     def _check_args(self, limit, wait_secs):
         """
@@ -279,24 +714,20 @@ class Redcapy:
         :return: collections.namedtuple of limit and wait_secs
         """
 
-        if (not isinstance(limit, int)) or (isinstance(limit, int) and limit < 1):
+        if not isinstance(limit, int) or limit < 1:
             limit = 1
-        if (not isinstance(wait_secs, int)) or (
-            isinstance(wait_secs, int) and wait_secs < 0
-        ):
+        if not isinstance(wait_secs, int) or wait_secs < 0:
             wait_secs = 1
 
-        ARGS = namedtuple("ARGS", "limit wait_secs")
-        rv = ARGS(limit=limit, wait_secs=wait_secs)
+        return _CheckedArgs(limit=limit, wait_secs=wait_secs)
 
-        return rv
-
-    def export_events(self, limit=3, wait_secs=3, **kwargs):
+    def export_events(self, limit=3, wait_secs=3, bypass_cache=False, **kwargs):
         """
             Export events from Redcap
 
             :param limit: int, >= 1, max number of recursive attempts
             :param wait_secs: int, >= 0, number of secs to wait between API calls
+            :param bypass_cache: bool.  When True, skip any cached response and fetch a fresh one from Redcap
 
             WARNING: Not all optional arguments have been tested.  Defaults are set in post_data.
 
@@ -320,29 +751,15 @@ class Redcapy:
         limit = checked_args.limit
         wait_secs = checked_args.wait_secs
 
-        post_data = {
-            "token": self._redcap_token,
-            "content": "event",
-            "format": "json",
-            "returnFormat": "json",
-        }
+        post_data = dict(self._EXPORT_EVENTS_POST_DATA, token=self.api_token)
 
-        if kwargs is not None:
-            for key, value in kwargs.items():
-                if (
-                    key
-                    in ["token", "content", "format", "arms", "returnFormat"]
-                    + self.retry_keys
-                ):
-                    post_data[key] = kwargs[key]
-                else:
-                    print("{} is not a valid key".format(key))
+        self._update_post_data(post_data, kwargs, self._EXPORT_EVENTS_KEYS)
 
         return self._core_api_code(
-            post_data=post_data, limit=limit, wait_secs=wait_secs
+            post_data=post_data, limit=limit, wait_secs=wait_secs, bypass_cache=bypass_cache
         )
 
-    def export_data_dictionary(self, limit=3, wait_secs=3, **kwargs):
+    def export_data_dictionary(self, limit=3, wait_secs=3, bypass_cache=False, **kwargs):
         """
             Export the data definitions.
 
@@ -352,6 +769,7 @@ class Redcapy:
 
             :param limit: int, >= 1, max number of recursive attempts
             :param wait_secs: int, >= 0, number of secs to wait between API calls
+            :param bypass_cache: bool.  When True, skip any cached response and fetch a fresh one from Redcap
             :param kwargs: Available options (check post_data for defaults)
                 token: {your token}
                 content: metadata
@@ -371,30 +789,16 @@ class Redcapy:
         limit = checked_args.limit
         wait_secs = checked_args.wait_secs
 
-        post_data = {
-            "token": self._redcap_token,
-            "content": "metadata",
-            "format": "json",
-            "returnFormat": "json",
-        }
+        post_data = dict(self._EXPORT_DATA_DICTIONARY_POST_DATA, token=self.api_token)
 
-        if kwargs is not None:
-            for key, value in kwargs.items():
-                if (
-                    key
-                    in ["token", "content", "format", "fields", "forms", "returnFormat"]
-                    + self.retry_keys
-                ):
-                    post_data[key] = kwargs[key]
-                else:
-                    print("{} is not a valid key".format(key))
+        self._update_post_data(post_data, kwargs, self._EXPORT_DATA_DICTIONARY_KEYS)
 
         return self._core_api_code(
-            post_data=post_data, limit=limit, wait_secs=wait_secs
+            post_data=post_data, limit=limit, wait_secs=wait_secs, bypass_cache=bypass_cache
         )
 
     def export_survey_link(
-        self, instrument, event, record, limit=3, wait_secs=3, **kwargs
+        self, instrument, event, record, limit=3, wait_secs=3, bypass_cache=False, **kwargs
     ):
         """
             Export a survey link to a single survey based on required arguments.
@@ -408,6 +812,7 @@ class Redcapy:
             :param record: record_id
             :param limit: int, >= 1, max number of recursive attempts
             :param wait_secs: int, >= 0, number of secs to wait between API calls
+            :param bypass_cache: bool.  When True, skip any cached response and fetch a fresh one from Redcap
             :param kwargs: Available options (check post_data for defaults)
                 token: {your instance token}
                 content: 'surveyLink' appears to be the only valid option
@@ -422,34 +827,20 @@ class Redcapy:
         limit = checked_args.limit
         wait_secs = checked_args.wait_secs
 
-        post_data = {
-            "token": self._redcap_token,
-            "content": "surveyLink",
-            "format": "json",
-            "instrument": instrument,
-            "event": event,
-            "record": record,
-            "returnFormat": "json",
-        }
+        post_data = dict(
+            self._EXPORT_SURVEY_LINK_POST_DATA, token=self.api_token, instrument=instrument, event=event, record=record
+        )
 
-        if kwargs is not None:
-            for key, value in kwargs.items():
-                if (
-                    key
-                    in ["token", "content", "format", "returnFormat"] + self.retry_keys
-                ):
-                    post_data[key] = kwargs[key]
-                else:
-                    print("{} is not a valid key".format(key))
+        self._update_post_data(post_data, kwargs, self._EXPORT_SURVEY_LINK_KEYS)
 
         return_value = self._core_api_code(
-            post_data=post_data, limit=limit, wait_secs=wait_secs
+            post_data=post_data, limit=limit, wait_secs=wait_secs, bypass_cache=bypass_cache
         )
 
         return return_value if return_value else ""
 
     def export_survey_participants(
-        self, instrument, event, limit=3, wait_secs=3, **kwargs
+        self, instrument, event, limit=3, wait_secs=3, bypass_cache=False, **kwargs
     ):
         """
             Export full list of surveys for a combination of instrument and event
@@ -462,6 +853,7 @@ class Redcapy:
             :param event: Redcap event name
             :param limit: int, >= 1, max number of recursive attempts
             :param wait_secs: int, >= 0, number of secs to wait between API calls
+            :param bypass_cache: bool.  When True, skip any cached response and fetch a fresh one from Redcap
             :param kwargs: Available options (check post_data for defaults)
                 token: {your instance token}
                 content: metadata
@@ -476,30 +868,19 @@ class Redcapy:
         limit = checked_args.limit
         wait_secs = checked_args.wait_secs
 
-        post_data = {
-            "token": self._redcap_token,
-            "content": "participantList",
-            "format": "json",
-            "instrument": instrument,
-            "event": event,
-            "returnFormat": "json",
-        }
+        post_data = dict(
+            self._EXPORT_SURVEY_PARTICIPANTS_POST_DATA, token=self.api_token, instrument=instrument, event=event
+        )
 
-        if kwargs is not None:
-            for key, value in kwargs.items():
-                if (
-                    key
-                    in ["token", "content", "format", "returnFormat"] + self.retry_keys
-                ):
-                    post_data[key] = kwargs[key]
-                else:
-                    print("{} is not a valid key".format(key))
+        self._update_post_data(post_data, kwargs, self._EXPORT_SURVEY_PARTICIPANTS_KEYS)
 
         return self._core_api_code(
-            post_data=post_data, limit=limit, wait_secs=wait_secs
+            post_data=post_data, limit=limit, wait_secs=wait_secs, bypass_cache=bypass_cache
         )
 
-    def export_records(self, limit=5, wait_secs=3, **kwargs):
+    def export_records(
+        self, limit=5, wait_secs=3, stream=False, use_cache=False, memory_cache_ttl=60, bypass_cache=False, **kwargs
+    ):
         """
             Export records (study data) from Redcap.
 
@@ -517,8 +898,21 @@ class Redcapy:
                 data_export = rc.export_records(rawOrLabel='label',
                                     fields='consent_date, randomization_id, record_id')
 
+                # Large exports: iterate the records while they download
+                for record in rc.export_records(stream=True):
+                    ...
+
             :param limit: int, >= 1, max number of recursive attempts
             :param wait_secs: int, >= 0, number of secs to wait between API calls
+            :param bypass_cache: bool.  When True, skip any cached response and fetch a fresh one from Redcap
+            :param stream: bool.  When True, return an iterator of record dicts parsed while the (gzip compressed)
+                    response is still arriving, using ijson if installed.  Only for the json format, and the
+                    request is not retried; last_status_code is set before the iterator is returned.
+            :param use_cache: bool.  When True, an identical export_records call made within memory_cache_ttl secs is
+                    answered from memory (a copy of the earlier response) instead of Redcap.  Unsafe while the
+                    records are being changed by imports, other scripts or users.  Ignored when stream is True.
+            :param memory_cache_ttl: int/float, secs a use_cache response is reused for.  Separate from the
+                    cache_ttl disk cache of the instance, which applies whether or not use_cache is set
             :param kwargs: Available options
                 token: {your token}
                 content: record
@@ -533,6 +927,7 @@ class Redcapy:
                 fields: string (Comma separated as a single string, not list, if multiple)
                 forms: string (Comma separated as a single string, not list, if multiple)
                 events: string (Comma separated as a single string, not list, if multiple)
+                records: list of record ids, sent as records[0], records[1], ...
 
             :return JSON object containing either the expected output or an error message from
                     __core_api_code__ method, or False if self._core_api_code fails
@@ -542,57 +937,125 @@ class Redcapy:
         limit = checked_args.limit
         wait_secs = checked_args.wait_secs
 
-        # TODO Add handling of record filter, in the form of record[0], record[1], etc.
         # TODO Add more defaults to method parameter list
-        post_data = {
-            "token": self._redcap_token,
-            "content": "record",
-            "format": "json",
-            "type": "flat",
-            "rawOrLabel": "raw",
-            "rawOrLabelHeaders": "raw",
-            "exportCheckboxLabel": "false",
-            "exportSurveyFields": "false",
-            "exportDataAccessGroups": "false",
-            "returnFormat": "json",
-        }
+        post_data = dict(self._EXPORT_RECORDS_POST_DATA, token=self.api_token)
 
-        if kwargs is not None:
-            for key, value in kwargs.items():
-                if (
-                    key
-                    in [
-                        "fields",
-                        "forms",
-                        "events",
-                        "records",
-                        "token",
-                        "content",
-                        "format",
-                        "type",
-                        "rawOrLabel",
-                        "rawOrLabelHeaders",
-                        "exportCheckboxLabel",
-                        "exportSurveyFields",
-                        "exportDataAccessGroups",
-                        "returnFormat",
-                    ]
-                    + self.retry_keys
-                ):
-                    post_data[key] = kwargs[key]
-                else:
-                    print("{} is not a valid key".format(key))
+        self._update_post_data(post_data, kwargs, self._EXPORT_RECORDS_KEYS)
 
-        return self._core_api_code(
-            post_data=post_data, limit=limit, wait_secs=wait_secs
+        # Redcap takes a list of records in the form of records[0], records[1], etc.
+        if isinstance(post_data.get("records"), (list, tuple)):
+            records = post_data.pop("records")
+            post_data.update(("records[{}]".format(i), record) for i, record in enumerate(records))
+
+        if stream:
+            return self._stream_records(post_data)
+
+        # The token is part of the key, so instances sharing a cache never mix up projects
+        cached = self._export_cache.get(post_data, memory_cache_ttl) if use_cache and not bypass_cache else None
+        if cached is not None:
+            self.last_status_code = 200
+            self.last_response = ""
+            return cached
+
+        response = self._core_api_code(
+            post_data=post_data, limit=limit, wait_secs=wait_secs, bypass_cache=bypass_cache
         )
 
+        if use_cache and isinstance(response, list):
+            self._export_cache.set(post_data, response)
+
+        return response
+
+    def export_records_chunked(self, chunk_size=100, record_id_field=None, **kwargs):
+        """
+            Export records a chunk_size records at a time instead of in one response, so a large project neither
+            times out on the server nor has to fit in memory at once.  The record ids are exported first, then
+            each chunk of ids is exported with export_records and yielded.
+
+            Example usage:
+                df = pd.concat(pd.DataFrame(chunk) for chunk in rc.export_records_chunked(rawOrLabel='label'))
+
+            :param chunk_size: int, >= 1, number of records exported per request
+            :param record_id_field: name of the record id field; the first field of the data dictionary if None
+            :param kwargs: Passed to export_records (check export_records for options), except records
+
+            :return: generator of the export_records response (a list of records, or an error message or False)
+                    for each chunk.  Stops after printing a message if the record ids cannot be exported.
+        """
+        if record_id_field is None:
+            data_dictionary = self.export_data_dictionary()
+            if not isinstance(data_dictionary, list) or not data_dictionary:
+                print("Unable to find the record id field from the data dictionary: {}".format(data_dictionary))
+                return
+            record_id_field = data_dictionary[0]["field_name"]
+
+        id_kwargs = {key: kwargs[key] for key in ("events", "token") if key in kwargs}
+        id_export = self.export_records(fields=record_id_field, **id_kwargs)
+        if not isinstance(id_export, list):
+            print("Unable to export record ids from Redcap: {}".format(id_export))
+            return
+
+        # Longitudinal projects return a row per record and event, so keep each id once, in export order
+        record_ids = list(dict.fromkeys(row[record_id_field] for row in id_export))
+        chunk_size = max(chunk_size, 1)
+
+        for i in range(0, len(record_ids), chunk_size):
+            yield self.export_records(records=record_ids[i : i + chunk_size], **kwargs)
+
+    def _stream_records(self, post_data):
+        """
+            POST a json record export with stream=True and return an iterator over the records, or False when
+            the connection fails or Redcap returns an error status
+        """
+        self.last_status_code = ""
+        self.last_response = ""
+
+        try:
+            # Leave compression on: the body is decoded as it is read rather than buffered in requests
+            r = self._session.post(
+                self.redcap_url,
+                data=post_data,
+                headers={"Accept-Encoding": "gzip, deflate"},
+                stream=True,
+            )
+        except Exception as e:
+            msg = "Redcapy: Error received when connecting to Redcap using requests.post(). Error: {}".format(
+                e
+            )
+            print(msg)
+            return False
+
+        self.last_status_code = r.status_code
+        self.last_response = r
+
+        if r.status_code != 200:
+            error = _ERROR_RE.search(r.text)
+            print(
+                "Critical: Redcap server returned a {} status code. Error received from Redcap: {}".format(
+                    r.status_code, html.unescape(error.group(1)) if error else r.text
+                )
+            )
+            r.close()
+            return False
+
+        return self._iter_records(r)
+
+    @staticmethod
+    def _iter_records(r):
+        with r:
+            if ijson is None:
+                # Without ijson the body is still downloaded compressed, then parsed in one go
+                yield from _json_loads(r.content)
+            else:
+                r.raw.decode_content = True
+                yield from ijson.items(r.raw, "item")
+
     def import_records(self, data_to_upload, **kwargs):
         """
             Upload single records into Redcap.  Bulk imports have not been tested.
             Note the post_data format field should match the data of the data field
-            JSON data should be passed in as a string, formatted to dump into JSON format, or a list that can
-                be dumped into JSON.
+            JSON data should be passed in as a string, formatted to dump into JSON format, or a dict (one record)
+                or list of dicts, which are dumped into JSON here.
             When passed as a jaon formatted string, the json should be enclosed with [].  If not present, then this
                 will add [].
             So the tested json data_to_upload format is a dict wrapped by json.dumps
@@ -619,13 +1082,13 @@ class Redcapy:
 
                 It is your responsibility to check the response above and react to errors for each record.  Despite the
                 small performance overhead of single vs. bulk record imports, this makes it easy to manage exceptions
-                and retries.
+                and retries.  For large uploads, import_records_bulk sends many records per request instead.
 
 
             WARNING: Not all optional arguments have been tested.  Defaults are set in post_data.
 
 
-            :param data_to_upload: json str
+            :param data_to_upload: json str, dict or list of dicts
             :param kwargs:  Available options (check post_data for defaults)
                 token: {your token}
                 content: record
@@ -643,56 +1106,94 @@ class Redcapy:
                 Otherwise returns a count of successful imports by default.
         """
 
-        post_data = {
-            "token": self._redcap_token,
-            "content": "record",
-            "format": "json",
-            "type": "flat",
-            "overwriteBehavior": "normal",
-            "data": data_to_upload,
-            "dateFormat": "YMD",
-            "returnContent": "count",
-            "returnFormat": "json",
-        }
+        post_data = dict(self._IMPORT_RECORDS_POST_DATA, token=self.api_token, data=data_to_upload)
 
-        if kwargs is not None:
-            for key, value in kwargs.items():
-                if (
-                    key
-                    in [
-                        "token",
-                        "content",
-                        "format",
-                        "type",
-                        "overwriteBehavior",
-                        "data",
-                        "dateFormat",
-                        "returnContent",
-                        "returnFormat",
-                    ]
-                    + self.retry_keys
-                ):
-                    post_data[key] = kwargs[key]
-                else:
-                    print("{} is not a valid key".format(key))
+        self._update_post_data(post_data, kwargs, self._IMPORT_RECORDS_KEYS)
 
         if post_data["format"] == "json":
-            if type(data_to_upload) == str:
-                if data_to_upload[:1] != "[":
-                    try:
-                        json.loads(data_to_upload)
-                        data_to_upload = json.dumps([json.loads(data_to_upload)])
-                        post_data["data"] = data_to_upload
-                    except Exception as e:
-                        print(
-                            "Please check if the data_to_upload field is formatted properly for conversion to JSON\n"
-                        )
+            if isinstance(data_to_upload, (dict, list)):
+                post_data["data"] = _json_dumps(
+                    [data_to_upload] if isinstance(data_to_upload, dict) else data_to_upload
+                )
+            elif isinstance(data_to_upload, str) and data_to_upload.lstrip()[:1] != "[":
+                # A single JSON object: bracket the text rather than parse and dump it.  Malformed JSON is
+                # reported back by Redcap.
+                post_data["data"] = "[" + data_to_upload + "]"
         else:
             # TODO
             pass
 
         return self._core_api_code(post_data=post_data)
 
+    def import_records_bulk(self, records, chunk_size=500, **kwargs):
+        """
+            Upload many records into Redcap with one import_records call per chunk_size records, rather than one
+            API round trip per record.
+
+            Example USAGE:
+                df_to_upload = pd.DataFrame('Your Data')
+                import_returns = rc.import_records_bulk(df_to_upload, chunk_size=200)
+
+            :param records: iterable of record dicts, or a pandas DataFrame with one record per row
+            :param chunk_size: int, >= 1, number of records sent in each POST
+            :param kwargs: Passed to import_records (check import_records for options); records are sent as json
+
+            :return: list with the import_records response for each chunk, in order.  Check each one for an
+                'error' key or False, as a failed chunk does not stop the remaining chunks from being sent.
+        """
+        chunk_size = max(chunk_size, 1)
+
+        if hasattr(records, "to_json"):
+            return [
+                self.import_records(data_to_upload=chunk, **kwargs)
+                for chunk in self._dataframe_json_chunks(records, chunk_size)
+            ]
+
+        records = iter(records)
+        responses = []
+
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                return responses
+
+            responses.append(self.import_records(data_to_upload=chunk, **kwargs))
+
+    def import_records_concurrently(self, records, max_workers=8, **kwargs):
+        """
+            Upload records one per request, as import_records does, but with up to max_workers requests in flight
+            at once over the instance's pooled connections.  Keeps the per-record responses of the one-at-a-time
+            loop while the waits on the network overlap.
+
+            Example USAGE:
+                df_to_upload = pd.DataFrame('Your Data')
+                import_returns = rc.import_records_concurrently(df_to_upload, max_workers=8)
+
+            Note that last_status_code and last_response are those of whichever request finished last.
+
+            :param records: iterable of record dicts, or a pandas DataFrame with one record per row
+            :param max_workers: int, number of concurrent requests, capped at the connection pool size (16)
+            :param kwargs: Passed to import_records (check import_records for options); records are sent as json
+
+            :return: list with the import_records response for each record, in order
+        """
+        if hasattr(records, "to_json"):
+            records = self._dataframe_json_chunks(records, 1)
+
+        def import_one(record):
+            return self.import_records(data_to_upload=record, **kwargs)
+
+        with ThreadPoolExecutor(max_workers=min(max(max_workers, 1), _POOL_MAXSIZE)) as executor:
+            return list(executor.map(import_one, records))
+
+    @staticmethod
+    def _dataframe_json_chunks(df, chunk_size):
+        # JSON text of each chunk_size rows of a pandas DataFrame.  to_json writes NaN cells as null and timestamps
+        # as ISO strings, as the per-row to_json of the import_records example does; a to_dict() of the rows
+        # dumped with the stdlib json module would write NaN, which is not JSON, and fail on timestamps.
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start : start + chunk_size].to_json(orient="records", date_format="iso")
+
     def delete_record(self, id_to_delete, **kwargs):
         """
             Delete a single record from Redcap.
@@ -713,19 +1214,10 @@ class Redcapy:
             :return: The number of records deleted
         """
 
-        post_data = {
-            "token": self._redcap_token,
-            "action": "delete",
-            "content": "record",
-            "records[0]": id_to_delete,
-        }
+        post_data = dict(self._DELETE_RECORD_POST_DATA, token=self.api_token)
+        post_data["records[0]"] = id_to_delete
 
-        if kwargs is not None:
-            for key, value in kwargs.items():
-                if key in ["token", "content", "records[0]", "arm"] + self.retry_keys:
-                    post_data[key] = kwargs[key]
-                else:
-                    print("{} is not a valid key".format(key))
+        self._update_post_data(post_data, kwargs, self._DELETE_RECORD_KEYS)
 
         return self._core_api_code(post_data=post_data)
 
@@ -751,34 +1243,16 @@ class Redcapy:
             :return: The number of records deleted
         """
 
-        post_data = {
-            "token": self._redcap_token,
-            "content": "file",
-            "action": "delete",
-            "record": id,
-            "field": field,
-            "event": event,
-            "repeat_instance": repeat_instance,
-        }
+        post_data = dict(
+            self._DELETE_FORM_POST_DATA,
+            token=self.api_token,
+            record=id,
+            field=field,
+            event=event,
+            repeat_instance=repeat_instance,
+        )
 
-        if kwargs is not None:
-            for key, value in kwargs.items():
-                if (
-                    key
-                    in [
-                        "token",
-                        "content",
-                        "action",
-                        "records[0]",
-                        "field",
-                        "event",
-                        "repeat_instance",
-                    ]
-                    + self.retry_keys
-                ):
-                    post_data[key] = kwargs[key]
-                else:
-                    print("{} is not a valid key".format(key))
+        self._update_post_data(post_data, kwargs, self._DELETE_FORM_KEYS)
 
         return self._core_api_code(post_data=post_data)
 
@@ -814,57 +1288,53 @@ class Redcapy:
 
             :return: None if successful, else potentially useful debugging info is returned
         """
-        post_data = {
-            "token": self._redcap_token,
-            "content": "file",
-            "format": "json",
-            "action": "import",
-            "record": record_id,
-            "field": field,
-            "event": event,
-            "returnFormat": "json",
-            "file": filename,
-        }
+        post_data = dict(
+            self._IMPORT_FILE_POST_DATA, token=self.api_token, record=record_id, field=field, event=event, file=filename
+        )
 
+        self._update_post_data(post_data, kwargs, self._IMPORT_FILE_KEYS)
+
+        # The other fields are passed as given; repeat_instance is the one commonly given as an int
         if repeat_instance:
             post_data["repeat_instance"] = str(repeat_instance)
 
-        if kwargs is not None:
-            for key, value in kwargs.items():
-                if (
-                    key
-                    in [
-                        "token",
-                        "content",
-                        "format",
-                        "action",
-                        "record",
-                        "field",
-                        "event",
-                        "returnContent",
-                        "file",
-                    ]
-                    + self.retry_keys
-                ):
-                    post_data[key] = str(kwargs[key])
-                else:
-                    print("{} is not a valid key".format(key))
-
-            if "action" in kwargs and kwargs["action"] in ["export", "delete"]:
-                post_data.pop("file")
+        action = kwargs.get("action")
 
-        else:
-            # TODO
-            pass
-
-        if "action" in kwargs and kwargs["action"] in ["delete"]:
+        if action == "delete":
+            post_data.pop("file", None)
             return self._core_api_code(post_data=post_data, delete_file=True)
-        elif "action" in kwargs and kwargs["action"] in ["export"]:
+        elif action == "export":
             print("File export method not yet implemented")
             return False
         else:
             return self._core_api_code(post_data=post_data, import_file=True)
 
+    def import_files_bulk(self, items, max_workers=8):
+        """
+            Upload many files into Redcap, with up to max_workers import_file calls in flight at once over the
+            instance's pooled connections, rather than one upload after another.
+
+            Example Usage:
+                import_responses = rc.import_files_bulk(
+                    [
+                        {"record_id": "1", "field": "redcap_field_name", "event": "data_import_arm_1",
+                         "filename": os.path.abspath("report_1.html")},
+                        {"record_id": "2", "field": "redcap_field_name", "event": "data_import_arm_1",
+                         "filename": os.path.abspath("report_2.html"), "repeat_instance": "2"},
+                    ]
+                )
+
+            Note that last_status_code and last_response are those of whichever upload finished last.
+
+            :param items: iterable of dicts of import_file arguments (record_id, field, event, filename and
+                    optionally repeat_instance)
+            :param max_workers: int, number of concurrent uploads, capped at the connection pool size (16)
+
+            :return: list with the import_file response for each item, in order
+        """
+        with ThreadPoolExecutor(max_workers=min(max(max_workers, 1), _POOL_MAXSIZE)) as executor:
+            return list(executor.map(lambda item: self.import_file(**item), items))
+
     def export_file(self, record_id, field, event, repeat_instance=None):
         """
             Identical to import file method, except for the action parameter, to export a file
@@ -902,20 +1372,20 @@ if __name__ == "__main__":
         if response and "error" not in response:
             return response
         else:
-            export_msg = "Failed to export records from Redcap for {}. Server returned: {}".format(
-                response
-            )
-            print(export_msg)
+            print("Failed to export records from Redcap. Server returned: {}".format(response))
 
-    if sys.argv[1] and sys.argv[2]:
+    if len(sys.argv) < 3:
+        print("Usage: python redcapy.py REDCAP_URL_ENV_VAR REDCAP_TOKEN_ENV_VAR")
+        sys.exit(2)
+    else:
+        env = os.environ
         try:
-            redcap_url = os.environ[sys.argv[1]]
-            redcap_token = os.environ[sys.argv[2]]
-
-            # Redcap instance
-            rc = Redcapy(api_token=redcap_token, redcap_url=redcap_url)
+            redcap_url = env[sys.argv[1]]
+            redcap_token = env[sys.argv[2]]
 
-            rc_export_raw = export_from_redcap(rc_instance=rc, rawOrLabel="raw")
-            pprint(rc_export_raw[0])
+            # Redcap instance; its pooled connections are closed on leaving the with block
+            with Redcapy(api_token=redcap_token, redcap_url=redcap_url) as rc:
+                rc_export_raw = export_from_redcap(rc_instance=rc, rawOrLabel="raw")
+                pprint(rc_export_raw[0])
         except Exception as e:
             print("Unable to export records from Redcap using provided credentials")
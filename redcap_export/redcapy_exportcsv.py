@@ -9,15 +9,58 @@
 
 import attr
 import csv
-import json
-import re
+import html
+import io
 import requests
+import socket
+import threading
 import time
 
 #from bs4 import BeautifulSoup (Chiefly used for testing/validating formats for importing into REDCap.) 
 from collections import namedtuple
-from functools import wraps
-from validator_collection import checkers
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from types import MappingProxyType
+from urllib3.connection import HTTPConnection
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+
+# Shared with Redcapy, so the URL check, error parsing and JSON parser cannot drift apart between the two
+from redcapy import _ERROR_RE, _URL_RE, _TTLCache, _is_url, _json_loads
+
+# Distinct metadata, field name and event responses kept in memory per instance; the least recently used is dropped
+_METADATA_CACHE_MAXSIZE = 32
+
+
+# Pooled connections probe an idle peer after 30 secs, then every 10 secs, and are dropped after 3 unanswered probes,
+# so a connection silently closed by a firewall or load balancer fails fast instead of stalling the next request.
+# TCP_KEEPIDLE and friends are missing on some platforms (macOS names the first one TCP_KEEPALIVE).
+_KEEPALIVE_SOCKET_OPTIONS = (
+    HTTPConnection.default_socket_options
+    + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    + [
+        (socket.IPPROTO_TCP, getattr(socket, name), value)
+        for name, value in (("TCP_KEEPIDLE", 30), ("TCP_KEEPALIVE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3))
+        if hasattr(socket, name)
+    ]
+)
+
+# Secs a session may sit unused before it is replaced, rather than trusting its long idle pooled connections
+_MAX_SESSION_IDLE_SECS = 600
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """
+        HTTPAdapter whose pooled connections use _KEEPALIVE_SOCKET_OPTIONS
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = _KEEPALIVE_SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+
+# Returned by Redcapy_exportcsv._check_args; defined once rather than on every call
+_CheckedArgs = namedtuple("ARGS", "limit wait_secs")
 
 
 @attr.s
@@ -26,9 +69,92 @@ class Redcapy_exportcsv:
     api_token = attr.ib(validator=attr.validators.instance_of(str))
     _redcap_token = ""  # later copies api_token value as private var
     redcap_url = attr.ib(validator=attr.validators.instance_of(str))
+    # Connections kept open to the Redcap server, and so the most concurrent exports worth making
+    pool = attr.ib(default=10, validator=attr.validators.instance_of(int))
+    # Retry policy for every API call: up to limit tries in all; the first retry is immediate, later ones wait
+    # wait_secs, then double the wait each time
+    limit = attr.ib(default=4)
+    wait_secs = attr.ib(default=3)
+    # Seconds to reuse data dictionary, field name and event exports from memory; 0 disables the cache
+    cache_ttl = attr.ib(default=300, validator=attr.validators.instance_of((int, float)))
     last_status_code = ""
     last_response = ""
-    retry_keys = ["limit", "wait_secs", "backoff", "logger"]  # Used by retry decorator
+
+    # POST fields each export accepts as kwargs
+    _EXPORT_EVENTS_KEYS = frozenset(["token", "content", "format", "arms", "returnFormat"])
+    _EXPORT_DATA_DICTIONARY_KEYS = frozenset(["token", "content", "format", "fields", "forms", "returnFormat"])
+    _EXPORT_RECORDS_KEYS = frozenset(
+        [
+            "fields",
+            "forms",
+            "events",
+            "records",
+            "token",
+            "content",
+            "format",
+            "type",
+            "rawOrLabel",
+            "rawOrLabelHeaders",
+            "exportCheckboxLabel",
+            "exportSurveyFields",
+            "exportDataAccessGroups",
+            "returnFormat",
+            "dateRangeBegin",
+            "dateRangeEnd",
+            "exportBlankForGrayFormStatus",
+        ]
+    )
+    _EXPORT_FIELD_NAMES_KEYS = frozenset(["token", "content", "format", "returnFormat"])
+    _EXPORT_REPORTS_KEYS = frozenset(
+        [
+            "token",
+            "content",
+            "format",
+            "report_id",
+            "csvDelimiter",
+            "rawOrLabel",
+            "rawOrLabelHeaders",
+            "exportCheckboxLabel",
+            "returnFormat",
+        ]
+    )
+
+    # Default POST fields for each export, minus the token; copied into post_data per call
+    _EXPORT_EVENTS_POST_DATA = MappingProxyType({"content": "event", "format": "csv", "returnFormat": "csv"})
+    _EXPORT_DATA_DICTIONARY_POST_DATA = MappingProxyType(
+        {"content": "metadata", "format": "csv", "returnFormat": "csv"}
+    )
+    _EXPORT_RECORDS_POST_DATA = MappingProxyType(
+        {
+            "content": "record",
+            "format": "csv",
+            "type": "flat",
+            "csvDelimiter": "",
+            "rawOrLabel": "raw",
+            "rawOrLabelHeaders": "raw",
+            "exportCheckboxLabel": "false",
+            "exportSurveyFields": "true",
+            "exportDataAccessGroups": "true",
+            "returnFormat": "csv",
+            "dateRangeBegin": "",
+            "exportBlankForGrayFormStatus": "true",
+        }
+    )
+    _EXPORT_FIELD_NAMES_POST_DATA = MappingProxyType(
+        {"content": "exportFieldNames", "format": "csv", "returnFormat": "csv"}
+    )
+    _EXPORT_REPORTS_POST_DATA = MappingProxyType(
+        {
+            "content": "report",
+            "format": "csv",
+            "report_id": "4792",
+            "csvDelimiter": "",
+            "rawOrLabel": "raw",
+            "rawOrLabelHeaders": "raw",
+            "exportCheckboxLabel": "false",
+            "returnFormat": "csv",
+        }
+    )
 
     @api_token.validator
     def check_and_mask_token(self, attribute, value):
@@ -49,151 +175,188 @@ class Redcapy_exportcsv:
 
     @redcap_url.validator
     def check_url(self, attribute, value):
-        if not checkers.is_url(self.redcap_url):
+        if not _is_url(self.redcap_url):
             msg = 'Invalid URL format detected for "{}" when initializing Redcapy instance'.format(
                 self.redcap_url
             )
             raise ValueError(msg)
 
+    def __attrs_post_init__(self):
+        # Connection errors, timeouts and the throttling/server error statuses are retried inside session.post,
+        # honoring any Retry-After header.  The REDCap API only takes POST, which urllib3 skips unless told otherwise.
+        # The last response is returned rather than raised once the tries run out, so its status code is reported.
+        checked_args = self._check_args(limit=self.limit, wait_secs=self.wait_secs)
+        self.limit = checked_args.limit
+        self.wait_secs = checked_args.wait_secs
+
+        self._retry = Retry(
+            total=self.limit - 1,
+            backoff_factor=self.wait_secs / 2,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["POST"],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+
+        # One keep-alive session per instance, so repeated exports reuse the connection (and TLS session) to the
+        # Redcap server instead of paying for a new handshake on every API call
+        self._session = self._new_session()
+        self._session_used_at = time.monotonic()
+        self._session_lock = threading.Lock()
+
+        # Schema exports, which rarely change during a run
+        self._metadata_cache = _TTLCache(_METADATA_CACHE_MAXSIZE)
+
+    def _new_session(self):
+        session = requests.Session()
+        adapter = _KeepAliveAdapter(pool_connections=self.pool, pool_maxsize=self.pool, max_retries=self._retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        # Ask for every content encoding urllib3 can decode here, so exports come back compressed
+        session.headers["Accept-Encoding"] = make_headers(accept_encoding=True)["accept-encoding"]
+
+        return session
+
+    def _fresh_session(self):
+        # The session to post with, replaced first if it sat unused for over _MAX_SESSION_IDLE_SECS
+        with self._session_lock:
+            now = time.monotonic()
+            if now - self._session_used_at > _MAX_SESSION_IDLE_SECS:
+                self._session.close()
+                self._session = self._new_session()
+            self._session_used_at = now
+
+            return self._session
+
     def __call__(self, *args, **kwargs):
         return self
 
-    class _Decorators:
-        @classmethod
-        def retry(cls, exceptions, limit=4, wait_secs=3, backoff=2, logger=None):
-            """
-                Retry calling the decorated function using an exponential backoff.
-
-                Ref: Adapted from https://www.calazan.com/retry-decorator-for-python-3/
-                    and https://medium.com/@vadimpushtaev/decorator-inside-python-class-1e74d23107f6
-                    and https://stackoverflow.com/a/19447502
-
-                :param exceptions: The exception to check. may be a tuple of exceptions to check.
-                :param limit: Number of times to try (not retry) before giving up.
-                :param wait_secs: Initial delay between retries in seconds.
-                :param backoff: Backoff multiplier (e.g. value of 2 will double the delay each retry).
-                :param logger: Logger to use. If None, print.
-            """
-
-            # Outer function retry is a wrapper for the inner decorator
-            def deco_retry(f):
-                @wraps(f)
-                def f_retry_wrapper(other_self, **kwargs):
-                    # mtries, mdelay = tries, delay
-                    post_data = kwargs.get("post_data", {})
-                    import_file = kwargs.get("import_file", False)
-                    delete_file = kwargs.get("delete_file", False)
-                    opt_post_data_kvpairs = kwargs.get("opt_post_data_kvpairs", None)
-
-                    mtries = kwargs.get("limit", limit)
-                    mdelay = kwargs.get("wait_secs", wait_secs)
-                    # mbackoff = kwargs.get('backoff', backoff)
-
-                    while mtries > 1:
-                        try:
-                            print("Attempting API connection...")
-                            rv = f(
-                                other_self,
-                                post_data=post_data,
-                                import_file=import_file,
-                                delete_file=delete_file,
-                                opt_post_data_kvpairs=opt_post_data_kvpairs,
-                                limit=mtries,
-                                wait_secs=mdelay,
-                            )
-
-                            if isinstance(rv, bool) and not rv:
-                                raise Exception
-
-                            return rv
-                        except (exceptions, Exception):
-                            mtries -= 1
-
-                            msg = "Up to {} attempt(s) remaining. Retrying in {} seconds...".format(
-                                mtries, mdelay
-                            )
-                            print(msg)
-
-                            if logger:
-                                logger.warning(msg)
-
-                            time.sleep(mdelay)
-                            mdelay *= backoff
-
-                    return f(
-                        other_self,
-                        post_data=post_data,
-                        import_file=import_file,
-                        delete_file=delete_file,
-                        opt_post_data_kvpairs=opt_post_data_kvpairs,
-                        limit=mtries,
-                        wait_secs=mdelay,
-                    )
-
-                return f_retry_wrapper
-
-            return deco_retry
-            print("Completed API connection attempt")
-
-    @_Decorators.retry(Exception)
-    def _core_api_code(
-        self,
-        post_data,
-        import_file=False,
-        delete_file=False,
-        opt_post_data_kvpairs=None,
-        **kwargs
-    ):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self):
+        """
+            Close the pooled connections to the Redcap server
+        """
+        self._session.close()
+
+    def invalidate_metadata(self):
+        """
+            Forget the cached data dictionary, field name and event exports, e.g. after the project schema changed
+        """
+        self._metadata_cache.clear()
+
+    def _cached_api_code(self, post_data):
+        """
+            _core_api_code for the schema exports, answered from memory when the same POST data was exported
+            successfully within cache_ttl secs.  Records and reports change too often to go through here.
+        """
+        if not self.cache_ttl:
+            return self._core_api_code(post_data=post_data)
+
+        cached = self._metadata_cache.get(post_data, self.cache_ttl)
+        if cached is not None:
+            self.last_status_code = 200
+            self.last_response = ""
+            return cached
+
+        response = self._core_api_code(post_data=post_data)
+
+        # _post returns False for every status but 200; last_status_code may meanwhile be set by another thread
+        if response is not False:
+            self._metadata_cache.set(post_data, response)
+
+        return response
+
+    def _core_api_code(self, post_data):
         """
             Common code elements to access Redcap API
 
-            :param post_data:  String that had been formatted as a json object using json.dumps()
-            :param opt_post_data_kvpairs:  Key value pairs to override POST data defaults.  Other
-                    internal methods provide key checks for post fields; however, no such checks
-                    are included if this override is used here.
-            :param import_file:  bool.  Set to True when the import_file method is being used (import_file
-                    and delete_file cannot both be True)
-            :param delete_file:  bool.  Set to True when the delete_file method is being used
+            :param post_data:  dict of POST fields, sent form encoded as the Redcap API expects
+
+            :return: CSV or XML (str), or JSON parsed into Python objects when post_data has format json, containing
+                    either the expected output or an error message.  Check Redcap documentation for any given method.
+                    Returns False when Redcap could not be reached or did not return a 200 status code
+        """
+        if not isinstance(post_data, dict):
+            raise TypeError(
+                "post_data passed to core_api_code method expected a dict but received a {} object".format(
+                    type(post_data).__name__
+                )
+            )
+
+        r = self._post(post_data)
+        if not r:
+            return False
+
+        if post_data.get("format") == "json":
+            # Parsed from the response bytes, so a large export is never decoded to a str first
+            try:
+                return _json_loads(r.content)
+            except ValueError:
+                pass
 
-            :return: One of several types, depending on the call. Check Redcap documentation for any given method.
-                    Returns CSV or JSON containing either the expected output or an error message for most calls.
-                    Returns False when error encountered
-                    Returns True after successfully deleting a file
-                    Returns str after exporting a survey URL
+        return r.text
 
-            WARNING: Original code returned JSON responses from server. CSV, XML and other export formats were not supported.
-            This code is currently being updated to support REDCap CSV exports and a broader set of REDCap export methods.  
+    def _post(self, post_data, stream=False):
+        """
+            POST to the Redcap API and check the status code, setting last_status_code and last_response.
+            With stream=True the body is only downloaded as it is read; use the returned response as a context
+            manager so its connection goes back to the pool.
+
+            :param post_data: dict of POST fields
+            :param stream: bool, passed to requests
+            :return: requests.Response, or False if Redcap could not be reached or did not return a 200 status code
         """
         self.last_status_code = ""
         self.last_response = ""
 
-        if opt_post_data_kvpairs is None:
-            opt_post_data_kvpairs = {}
+        try:
+            r = self._fresh_session().post(self.redcap_url, data=post_data, timeout=(5, 60), stream=stream)
+        except requests.exceptions.RequestException as e:
+            msg = "Redcapy: Error received when connecting to Redcap using requests.post(). Error: {}".format(
+                e
+            )
+            print(msg)
+            return False
 
-        assert isinstance(
-            post_data, dict
-        ), "{} passed to core_api_code method \
-            expected a dict but received a {} object".format(
-            post_data, type(post_data)
-        )
+        self.last_status_code = r.status_code
+        self.last_response = r
 
-        if opt_post_data_kvpairs is not None:
-            for key, value in opt_post_data_kvpairs.items():
-                post_data[key] = value
-      
-        try:
-            self.last_status_code = r.status_code
-            self.last_response = r
+        if r.status_code != 200:
+            msg = "Critical: Redcap server returned a {} status code. ".format(
+                r.status_code
+            )
 
-            if r.status_code != 200:
-                msg = "Critical: Redcap server returned a {} status code. ".format(
-                    r.status_code
-                )
-                print(msg)
-                return False
-              
-            else:
-            return True
+            error = None
+            try:
+                error = _json_loads(r.content).get("error")
+            except (ValueError, AttributeError):
+                pass
+
+            xml_error = _ERROR_RE.search(r.text)
+            msg += "Error received from Redcap: {}".format(
+                html.unescape(xml_error.group(1)) if xml_error else error or r.text
+            )
+
+            print(msg)
+            r.close()
+            return False
+
+        return r
+
+    @staticmethod
+    def _update_post_data(post_data, kwargs, valid_keys):
+        # Copy the kwargs an export accepts into post_data; the rest are reported and ignored
+        post_data.update((key, value) for key, value in kwargs.items() if key in valid_keys)
+
+        for key in kwargs.keys() - valid_keys:
+            print("{} is not a valid key".format(key))
 
     def _api_error_handler(self, error_message):
         # TODO
@@ -210,11 +373,8 @@ class Redcapy_exportcsv:
         :return: str, URL of the first URL found in the supplied str argument
         """
 
-        url_list = re.findall(
-            "http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]| [! *(),] | (?: %[0-9a-fA-F][0-9a-fA-F]))+",
-            str_to_parse,
-        )
-        return url_list[0] if len(url_list) > 0 else ""
+        url = _URL_RE.search(str_to_parse)
+        return url.group(0) if url else ""
 
     def _check_args(self, limit, wait_secs):
         """
@@ -224,24 +384,17 @@ class Redcapy_exportcsv:
         :return: collections.namedtuple of limit and wait_secs
         """
 
-        if (not isinstance(limit, int)) or (isinstance(limit, int) and limit < 1):
+        if not isinstance(limit, int) or limit < 1:
             limit = 1
-        if (not isinstance(wait_secs, int)) or (
-            isinstance(wait_secs, int) and wait_secs < 0
-        ):
+        if not isinstance(wait_secs, int) or wait_secs < 0:
             wait_secs = 1
 
-        ARGS = namedtuple("ARGS", "limit wait_secs")
-        rv = ARGS(limit=limit, wait_secs=wait_secs)
-
-        return rv
+        return _CheckedArgs(limit=limit, wait_secs=wait_secs)
 
-    def export_events(self, limit=3, wait_secs=3, **kwargs):
+    def export_events(self, **kwargs):
         """
             Export events from Redcap
 
-            :param limit: int, >= 1, max number of recursive attempts
-            :param wait_secs: int, >= 0, number of secs to wait between API calls
 
             WARNING: Not all optional arguments have been tested.  Defaults are set in post_data.
 
@@ -261,33 +414,13 @@ class Redcapy_exportcsv:
         :return: object in specified format (json or csv) containing either the expected output or an error message from __core_api_code__ method
         """
 
-        checked_args = self._check_args(limit=limit, wait_secs=wait_secs)
-        limit = checked_args.limit
-        wait_secs = checked_args.wait_secs
+        post_data = dict(self._EXPORT_EVENTS_POST_DATA, token=self._redcap_token)
 
-        post_data = {
-            "token": self._redcap_token,
-            "content": "event",
-            "format": "csv",
-            "returnFormat": "csv",
-        }
+        self._update_post_data(post_data, kwargs, self._EXPORT_EVENTS_KEYS)
 
-        if kwargs is not None:
-            for key, value in kwargs.items():
-                if (
-                    key
-                    in ["token", "content", "format", "arms", "returnFormat"]
-                    + self.retry_keys
-                ):
-                    post_data[key] = kwargs[key]
-                else:
-                    print("{} is not a valid key".format(key))
+        return self._cached_api_code(post_data)
 
-        return self._core_api_code(
-            post_data=post_data, limit=limit, wait_secs=wait_secs
-        )
-
-    def export_data_dictionary(self, limit=3, wait_secs=3, **kwargs):
+    def export_data_dictionary(self, **kwargs):
         """
             Export the data definitions.
 
@@ -295,8 +428,6 @@ class Redcapy_exportcsv:
                 replace the default POST options.
             Note that the format for returned data is the format field, not the returnFormat field.
 
-            :param limit: int, >= 1, max number of recursive attempts
-            :param wait_secs: int, >= 0, number of secs to wait between API calls
             :param kwargs: Available options (check post_data for defaults)
                 token: {your token}
                 content: metadata
@@ -312,33 +443,13 @@ class Redcapy_exportcsv:
                     __core_api_code__ method
         """
 
-        checked_args = self._check_args(limit=limit, wait_secs=wait_secs)
-        limit = checked_args.limit
-        wait_secs = checked_args.wait_secs
-
-        post_data = {
-            "token": self._redcap_token,
-            "content": "metadata",
-            "format": "csv",
-            "returnFormat": "csv",
-        }
+        post_data = dict(self._EXPORT_DATA_DICTIONARY_POST_DATA, token=self._redcap_token)
 
-        if kwargs is not None:
-            for key, value in kwargs.items():
-                if (
-                    key
-                    in ["token", "content", "format", "fields", "forms", "returnFormat"]
-                    + self.retry_keys
-                ):
-                    post_data[key] = kwargs[key]
-                else:
-                    print("{} is not a valid key".format(key))
+        self._update_post_data(post_data, kwargs, self._EXPORT_DATA_DICTIONARY_KEYS)
 
-        return self._core_api_code(
-            post_data=post_data, limit=limit, wait_secs=wait_secs
-        )
+        return self._cached_api_code(post_data)
 
-    def export_records(self, limit=5, wait_secs=3, **kwargs):
+    def export_records(self, **kwargs):
         """
             Export records (study data) from Redcap.
 
@@ -356,8 +467,6 @@ class Redcapy_exportcsv:
                 data_export = rc.export_records(rawOrLabel='raw',
                                     fields='consent_date, randomization_id, record_id')
 
-            :param limit: int, >= 1, max number of recursive attempts
-            :param wait_secs: int, >= 0, number of secs to wait between API calls
             :param kwargs: Available options
                 token: {your token}
                 content: record
@@ -381,63 +490,102 @@ class Redcapy_exportcsv:
             :return object in specified format (json or csv) containing either the expected output or an error message from
                     __core_api_code__ method, or False if self._core_api_code fails
         """
+        return self._core_api_code(post_data=self._build_record_post(**kwargs))
+
+    def export_records_to_file(self, path, chunk=1 << 20, **kwargs):
+        """
+            Export records straight to the file at path, chunk bytes at a time as the response arrives, so a large
+            export is never held in memory.
+
+            Example usage:
+                rc.export_records_to_file('rc_export/records.csv', dateRangeBegin='2022-06-08 00:00:00')
+
+            :param path: path of the file to write; an existing file is overwritten
+            :param chunk: int, bytes read from the response and written per iteration
+            :param kwargs: Same options as export_records
+
+            :return: path, or False if Redcap could not be reached or did not return a 200 status code
+        """
+        r = self._post(self._build_record_post(**kwargs), stream=True)
+        if not r:
+            return False
+
+        with r, open(path, "wb") as f:
+            for block in r.iter_content(chunk_size=chunk):
+                f.write(block)
+
+        return path
+
+    def iter_records_csv(self, **kwargs):
+        """
+            Yield the rows, header first, of a CSV records export as lists of str while the response is still
+            arriving, so rows can be processed without first holding the whole export in memory.
+
+            Example usage:
+                rows = rc.iter_records_csv(forms='enrollment')
+                header = next(rows)
+                for row in rows:
+                    ...
+
+            :param kwargs: Same options as export_records; format is expected to be csv
+
+            :return: generator of rows.  Yields nothing if Redcap could not be reached or did not return a 200
+                    status code; check last_status_code.
+        """
+        r = self._post(self._build_record_post(**kwargs), stream=True)
+        if not r:
+            return
+
+        with r:
+            # Read through the raw urllib3 response, which then also undoes any gzip content encoding.  The response
+            # is kept open at the end of the body, as TextIOWrapper reads once more after it to see the end.
+            r.raw.decode_content = True
+            r.raw.auto_close = False
+            for row in csv.reader(io.TextIOWrapper(r.raw, encoding="utf-8", newline="")):
+                yield row
+
+    def export_records_dataframe(self, read_csv_kwargs=None, **kwargs):
+        """
+            Export records as a pandas DataFrame, parsed by the pandas C parser directly from the response as it
+            arrives, rather than from a str of the whole export.  pandas is imported on first use, so only callers
+            of this method need it installed.
 
-        checked_args = self._check_args(limit=limit, wait_secs=wait_secs)
-        limit = checked_args.limit
-        wait_secs = checked_args.wait_secs
+            Example usage:
+                df = rc.export_records_dataframe(read_csv_kwargs={'dtype': str}, forms='enrollment')
+                # pandas >= 2.0 with pyarrow installed: Arrow backed columns
+                df = rc.export_records_dataframe(read_csv_kwargs={'dtype_backend': 'pyarrow'})
 
+            :param read_csv_kwargs: optional dict of options passed on to pandas.read_csv
+            :param kwargs: Same options as export_records; format is expected to be csv
+
+            :return: pandas.DataFrame, or False if Redcap could not be reached or did not return a 200 status code
+        """
+        import pandas
+
+        r = self._post(self._build_record_post(**kwargs), stream=True)
+        if not r:
+            return False
+
+        with r:
+            # As in iter_records_csv, pandas reads the raw urllib3 response, ungzipped and kept open at its end
+            r.raw.decode_content = True
+            r.raw.auto_close = False
+            return pandas.read_csv(r.raw, **dict({"engine": "c", "low_memory": False}, **(read_csv_kwargs or {})))
+
+    def _build_record_post(self, **kwargs):
+        """
+            POST data for a records export: the defaults updated with the valid keys in kwargs
+            (check export_records for options)
+        """
         # TODO Add handling of record filter, in the form of record[0], record[1], etc.
         # TODO Add way to set dateRangeBegin to time of the last export (or current minus one week)
-        post_data = {
-            "token": self._redcap_token,
-            "content": "record",
-            "format": "csv",
-            "type": "flat",
-            "csvDelimiter": '',
-            "rawOrLabel": "raw",
-            "rawOrLabelHeaders": "raw",
-            "exportCheckboxLabel": "false",
-            "exportSurveyFields": "true",
-            "exportDataAccessGroups": "true",
-            "returnFormat": "csv",
-            "dateRangeBegin":"",
-            "exportBlankForGrayFormStatus": "true"
-        }
+        post_data = dict(self._EXPORT_RECORDS_POST_DATA, token=self._redcap_token)
 
-        if kwargs is not None:
-            for key, value in kwargs.items():
-                if (
-                    key
-                    in [
-                        "fields",
-                        "forms",
-                        "events",
-                        "records",
-                        "token",
-                        "content",
-                        "format",
-                        "type",
-                        "rawOrLabel",
-                        "rawOrLabelHeaders",
-                        "exportCheckboxLabel",
-                        "exportSurveyFields",
-                        "exportDataAccessGroups",
-                        "returnFormat",
-                        "dateRangeBegin",
-                        "dateRangeEnd",
-                        "exportBlankForGrayFormStatus"
-                    ]
-                    + self.retry_keys
-                ):
-                    post_data[key] = kwargs[key]
-                else:
-                    print("{} is not a valid key".format(key))
+        self._update_post_data(post_data, kwargs, self._EXPORT_RECORDS_KEYS)
 
-        return self._core_api_code(
-            post_data=post_data, limit=limit, wait_secs=wait_secs
-        )
+        return post_data
 
- def export_field_names(self, limit=3, wait_secs=3, **kwargs):
+    def export_field_names(self, **kwargs):
         """
             Export_field_names provides the list of field names (including checkbox variables) which can be compared more easily than the metadata
             files to determine if any changes to the data schema have been made. This table can also serve as the basis for mapping variable names between
@@ -445,8 +593,6 @@ class Redcapy_exportcsv:
             Any changes to the POST data will be passed entirely to core_api_code method to
                 replace the default POST options.
             Note that the format for returned data is the format field, not the returnFormat field.
-            :param limit: int, >= 1, max number of recursive attempts
-            :param wait_secs: int, >= 0, number of secs to wait between API calls
             :param kwargs: Available options (check post_data for defaults)
                 token: {your token}
                 content: exportFieldNames
@@ -458,33 +604,13 @@ class Redcapy_exportcsv:
                     __core_api_code__ method
         """
 
-        checked_args = self._check_args(limit=limit, wait_secs=wait_secs)
-        limit = checked_args.limit
-        wait_secs = checked_args.wait_secs
+        post_data = dict(self._EXPORT_FIELD_NAMES_POST_DATA, token=self._redcap_token)
 
-        post_data = {
-            "token": self._redcap_token,
-            "content": "exportFieldNames",
-            "format": "csv",
-            "returnFormat": "csv",
-        }
+        self._update_post_data(post_data, kwargs, self._EXPORT_FIELD_NAMES_KEYS)
 
-        if kwargs is not None:
-            for key, value in kwargs.items():
-                if (
-                    key
-                    in ["token", "content", "format", "returnFormat"]
-                    + self.retry_keys
-                ):
-                    post_data[key] = kwargs[key]
-                else:
-                    print("{} is not a valid key".format(key))
-
-        return self._core_api_code(
-            post_data=post_data, limit=limit, wait_secs=wait_secs
-        )   
+        return self._cached_api_code(post_data)   
 
- def export_reports(self, limit=3, wait_secs=3, **kwargs):
+    def export_reports(self, **kwargs):
         """
             Export_reports allows flexibility to build and preview reports within REDCap using advanced filters, and then export the resulting data.
             One caveat is that while the report data updates dynamically, fields that are added to an instrument after defining the report
@@ -493,8 +619,6 @@ class Redcapy_exportcsv:
             
             Any changes to the POST data will be passed entirely to core_api_code method to replace the default POST options.
             Note that the format for returned data is the format field, not the returnFormat field.
-            :param limit: int, >= 1, max number of recursive attempts
-            :param wait_secs: int, >= 0, number of secs to wait between API calls
             :param kwargs: Available options (check post_data for defaults)
                 token: {your token}
                 content: exportFieldNames
@@ -509,41 +633,108 @@ class Redcapy_exportcsv:
                 returnFormat: json/csv
             :return: object in specified format (json or csv) containing either the expected output or an error message from
                     __core_api_code__ method
-                    
-            TODO: replace static report_id with list of reports to be exported.
-        """
 
-        checked_args = self._check_args(limit=limit, wait_secs=wait_secs)
-        limit = checked_args.limit
-        wait_secs = checked_args.wait_secs
+            Use export_reports_many to export a list of reports.
+        """
 
-        post_data = {
-            "token": self._redcap_token,
-            "content": "report",
-            "format": "csv",
-            "report_id":"4792",
-            'csvDelimiter': '',
-            'rawOrLabel': 'raw',
-            'rawOrLabelHeaders': 'raw',
-            'exportCheckboxLabel': 'false',
-            "returnFormat": "csv",
-        }
+        post_data = dict(self._EXPORT_REPORTS_POST_DATA, token=self._redcap_token)
 
-        if kwargs is not None:
-            for key, value in kwargs.items():
-                if (
-                    key
-                    in ["token", "content", "format", "returnFormat"]
-                    + self.retry_keys
-                ):
-                    post_data[key] = kwargs[key]
-                else:
-                    print("{} is not a valid key".format(key))
+        self._update_post_data(post_data, kwargs, self._EXPORT_REPORTS_KEYS)
 
         return self._core_api_code(
-            post_data=post_data, limit=limit, wait_secs=wait_secs
-        )   
-    
+            post_data=post_data
+        )
+
+    def export_reports_many(self, report_ids, max_workers=8, **kwargs):
+        """
+            Export several reports at once, with up to max_workers export_reports calls in flight over the
+            instance's pooled connections, rather than one report after another.
+
+            Example usage:
+                reports = rc.export_reports_many(['4792', '4793'], rawOrLabel='label')
+
+            :param report_ids: list of report ids
+            :param max_workers: int, number of concurrent exports, capped at the pool size of the instance
+            :param kwargs: Passed to export_reports (check export_reports for options), except report_id
+
+            :return: dict of report_id to the export_reports response, or the exception raised exporting that
+                    report, so that one failed report does not lose the others
+        """
+        return self._export_many(
+            self.export_reports, "report_id", report_ids, max_workers, kwargs
+        )
+
+    def export_records_batched(self, forms, max_workers=8, **kwargs):
+        """
+            Export records one form at a time, with up to max_workers export_records calls in flight over the
+            instance's pooled connections.  Smaller per-form exports are less likely to time out on the server.
+
+            Example usage:
+                records_by_form = rc.export_records_batched(['enrollment', 'baseline'], rawOrLabel='label')
+
+            :param forms: list of form names
+            :param max_workers: int, number of concurrent exports, capped at the pool size of the instance
+            :param kwargs: Passed to export_records (check export_records for options), except forms
+
+            :return: dict of form name to the export_records response, or the exception raised exporting that form
+        """
+        return self._export_many(self.export_records, "forms", forms, max_workers, kwargs)
+
+    def gather_exports(self, kwargs_list, paths=None, max_workers=8):
+        """
+            Run several records exports at once, e.g. one per event, form or dateRangeBegin/dateRangeEnd window,
+            with up to max_workers in flight over the instance's pooled connections, so their round trips and
+            server side query times overlap instead of adding up.
+
+            Example usage:
+                windows = [{'dateRangeBegin': '2022-01-01 00:00:00', 'dateRangeEnd': '2022-07-01 00:00:00'},
+                           {'dateRangeBegin': '2022-07-01 00:00:00', 'dateRangeEnd': '2023-01-01 00:00:00'}]
+                paths = rc.gather_exports(windows, paths=['records_2022a.csv', 'records_2022b.csv'])
+
+            :param kwargs_list: list of dicts of export_records options, one per export
+            :param paths: optional list of file paths, one per export.  When given, each export is streamed to its
+                    file with export_records_to_file instead of being returned in memory.
+            :param max_workers: int, number of concurrent exports, capped at the pool size of the instance
+
+            :return: list, in the order of kwargs_list, of the export_records (or export_records_to_file) response,
+                    or the exception raised by that export, so that one failed export does not lose the others
+        """
+        kwargs_list = list(kwargs_list)
+
+        if paths is None:
+            calls = [lambda kwargs=kwargs: self.export_records(**kwargs) for kwargs in kwargs_list]
+        else:
+            paths = list(paths)
+            if len(paths) != len(kwargs_list):
+                msg = "gather_exports expected one path per export but received {} paths for {} exports".format(
+                    len(paths), len(kwargs_list)
+                )
+                raise ValueError(msg)
+            calls = [
+                lambda kwargs=kwargs, path=path: self.export_records_to_file(path, **kwargs)
+                for kwargs, path in zip(kwargs_list, paths)
+            ]
+
+        return self._run_concurrently(calls, max_workers)
+
+    def _export_many(self, export_method, key, values, max_workers, kwargs):
+        # Runs export_method once per value, passed as the key kwarg, and maps each value to its result
+        values = list(values)
+        calls = [lambda value=value: export_method(**dict(kwargs, **{key: value})) for value in values]
+
+        return dict(zip(values, self._run_concurrently(calls, max_workers)))
+
+    def _run_concurrently(self, calls, max_workers):
+        # Calls each of calls over a thread pool sized to the connection pool; returns their results (or the
+        # exceptions they raised) in order
+        if not calls:
+            return []
+
+        with ThreadPoolExecutor(max_workers=max(min(max_workers, self.pool, len(calls)), 1)) as executor:
+            futures = [executor.submit(call) for call in calls]
+
+        return [future.exception() or future.result() for future in futures]
+
     
     
     
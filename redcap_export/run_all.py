@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+# Runs REDCap exports concurrently over the shared session and saves each response to config['export_dir']
+# (default rc_export) as [job]_DATA_[export_date]_[hhmm].[format], following the REDCap download naming.
+#
+# Usage: python run_all.py [job ...]    Runs every job in JOBS when no job is named.
+#
+# Every report_id in the first column of ctrn_report_ids.csv (or config['report_ids_csv']) is saved as its own
+# report_[report_id]_DATA_... file; report 4792 is exported when no such CSV is present.
+# The exports are I/O bound, so total wall time is close to the slowest export instead of the sum of all of them.
+# Requests are throttled to config['rate_max'] per config['rate_period'] seconds (default 10 per second).
+# Set config['cache_ttl'] (seconds) to reuse the dags, events, field_names and metadata responses cached under
+# config['cache_dir'] (default .redcap_cache) instead of fetching them again; caching is off by default.
+# The logging job splits the log window into max_workers equal shards fetched concurrently, or into
+# config['log_shard_days'] day shards when that is set.
+#
+# The export_*.py scripts are thin wrappers that run a single job from JOBS.
+
+import codecs
+import csv
+import hashlib
+import os
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
+from types import MappingProxyType
+from urllib.parse import urlencode
+
+try:
+    import orjson as _json  # optional, for fetch_json; same loads() call as the stdlib module
+except ImportError:
+    import json as _json
+
+from config import config
+from _client import SESSION, TOKEN, URL, MAX_WORKERS, TIMEOUT, RateLimiter, stream_to
+
+# POST fields for each export, minus the token.  Job names match the export_[job].py scripts.
+JOBS = {
+    'dags': {'content': 'dag', 'format': 'csv'},
+    'events': {'content': 'event', 'format': 'csv', 'arms': ''},
+    'field_names': {'content': 'exportFieldNames', 'format': 'csv', 'returnFormat': 'csv'},
+    'file': {'content': 'file', 'action': 'export', 'record': 'f21a3ffd37fc0b3c', 'field': 'file_upload',
+             'event': 'event_1_arm_1'},
+    'logging': {'content': 'log', 'format': 'csv', 'logtype': 'record', 'user': '', 'record': '',
+                'beginTime': '2020-06-23 14:45', 'endTime': '', 'returnFormat': 'csv'},
+    'metadata': {'content': 'metadata', 'format': 'csv', 'returnFormat': 'csv'},
+    'records': {'content': 'record', 'action': 'export', 'format': 'csv', 'type': 'flat', 'csvDelimiter': '',
+                'rawOrLabel': 'raw', 'rawOrLabelHeaders': 'raw', 'exportCheckboxLabel': 'false',
+                'exportSurveyFields': 'true', 'exportDataAccessGroups': 'true', 'returnFormat': 'csv',
+                'dateRangeBegin': '2022-06-08 00:00:00', 'exportBlankForGrayFormStatus': 'true'},
+    'reports': {'content': 'report', 'format': 'csv', 'report_id': '4792', 'csvDelimiter': '', 'rawOrLabel': 'raw',
+                'rawOrLabelHeaders': 'raw', 'exportCheckboxLabel': 'false', 'returnFormat': 'csv'},
+}
+JOBS = {job: MappingProxyType(fields) for job, fields in JOBS.items()}
+
+LIMITER = RateLimiter(config.get('rate_max', 10), config.get('rate_period', 1.0))
+FORM_HEADERS = MappingProxyType({'Content-Type': 'application/x-www-form-urlencoded'})
+
+# Exports that rarely change between runs and so may be answered from the on-disk cache
+CACHEABLE_JOBS = frozenset({'dags', 'events', 'field_names', 'metadata'})
+CACHE_TTL = config.get('cache_ttl', 0)
+CACHE_DIR = config.get('cache_dir', '.redcap_cache')
+
+LOG_SHARD_DAYS = config.get('log_shard_days')  # None: MAX_WORKERS equal shards, so the log query count stays bounded
+LOG_TIME_FORMAT = '%Y-%m-%d %H:%M'
+
+
+@lru_cache(maxsize=None)
+def _encoded_fields(job, omit=()):
+    # Form-encoded JOBS[job] plus the token, minus any overridden keys; built once per job and reused for every POST
+    return urlencode([(k, v) for k, v in JOBS[job].items() if k not in omit] + [('token', TOKEN)]).encode()
+
+
+def open_export(job, overrides=None, timeout=TIMEOUT):
+    """
+        POST the fields for JOBS[job], with any overrides, and return the streamed response.
+        Use the response as a context manager so its connection is returned to the pool.
+        Bodies are written as bytes; r.text is only needed for error messages.
+    """
+    if overrides:
+        body = _encoded_fields(job, tuple(sorted(overrides))) + b'&' + urlencode(overrides).encode()
+    else:
+        body = _encoded_fields(job)
+
+    cache_path = None
+    if CACHE_TTL and job in CACHEABLE_JOBS:
+        # keyed on the whole encoded body, so a different project token or field set never shares an entry
+        cache_path = os.path.join(CACHE_DIR, hashlib.sha256(body).hexdigest())
+        if os.path.exists(cache_path) and time.time() - os.path.getmtime(cache_path) < CACHE_TTL:
+            return _CachedExport(cache_path)
+
+    with LIMITER:
+        r = SESSION.post(URL, data=body, headers=FORM_HEADERS, stream=True, timeout=timeout)
+
+    # REDCap returns UTF-8; setting it skips requests' charset detection over the whole body if r.text is read
+    r.encoding = 'utf-8'
+
+    if cache_path and r.status_code == 200:
+        # Readable by the current user only, like the Redcapy export cache
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        tmp_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+
+        try:
+            with r, os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+                stream_to(r, f)
+        except BaseException:
+            # A download cut short leaves no partial entry behind
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, cache_path)
+
+        return _CachedExport(cache_path)
+
+    return r
+
+
+class _CachedExport:
+    """
+        Stands in for the streamed requests.Response when a cached export body is replayed from disk.
+    """
+    status_code = 200
+    encoding = 'utf-8'
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=1):
+        with open(self.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                yield chunk
+
+
+def print_export(job):
+    """
+        Print the HTTP status for JOBS[job] and stream the body to stdout.
+        Both go through one 64 KiB buffered binary writer, so piped output is not flushed line by line.
+    """
+    sys.stdout.flush()
+
+    with open(sys.stdout.fileno(), 'wb', buffering=1 << 16, closefd=False) as out, open_export(job) as r:
+        out.write(b'HTTP Status: ' + str(r.status_code).encode() + b'\n')
+        stream_to(r, out)
+
+
+def print_logging_export(shard_days=LOG_SHARD_DAYS):
+    """
+        Print the JOBS['logging'] export like print_export('logging'), but fetch it as time windows in parallel
+        instead of as one long download: shard_days long windows, or MAX_WORKERS equal ones when shard_days is None.
+        Each window is a separate log query on the REDCap server, so short shards over a long log mean many queries.
+        Shards are written newest first, matching REDCap's own ordering of the log, and the header row is written once.
+    """
+    sys.stdout.flush()
+
+    with open(sys.stdout.fileno(), 'wb', buffering=1 << 16, closefd=False) as out:
+        for i, (status, window, body) in enumerate(_log_shards(shard_days)):
+            if status != 200:
+                out.write('HTTP Status: {} ({} to {})\n'.format(status, *window).encode() + body)
+                return
+
+            if i == 0:
+                out.write(b'HTTP Status: 200\n')
+            out.write(body)
+
+
+def _log_shards(shard_days):
+    # (status, window, body) for each log shard, newest first, with the CSV header row kept on the first body only.
+    # Stops after the first shard REDCap did not return a 200 for.
+    fields = JOBS['logging']
+    begin = datetime.strptime(fields['beginTime'], LOG_TIME_FORMAT)
+
+    # The client clock only sizes the windows; REDCap logs in the server's local time, so the newest window keeps
+    # the job's endTime (blank for "up to now" on the server) and nothing logged past the client's now is dropped
+    end = datetime.strptime(fields['endTime'], LOG_TIME_FORMAT) if fields['endTime'] else datetime.now()
+
+    if shard_days:
+        step = timedelta(days=shard_days)
+    else:
+        # whole minutes, as REDCap matches beginTime and endTime to the minute
+        minutes = (end - begin) // timedelta(minutes=1) + 1
+        step = timedelta(minutes=max(-(-minutes // MAX_WORKERS), 1))
+
+    windows = list(_log_windows(begin, end, step))[::-1] or [(fields['beginTime'], fields['endTime'])]
+    windows[0] = windows[0][0], fields['endTime']
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        wrote_header = False
+
+        # map yields in window order, so each shard is passed on as soon as it and the newer ones have arrived
+        for window, (status, body) in zip(windows, ex.map(_fetch_log_shard, windows)):
+            if status != 200:
+                yield status, window, body
+                return
+
+            if wrote_header:
+                body = body.partition(b'\n')[2]
+
+            yield status, window, body
+            wrote_header = wrote_header or bool(body)
+
+
+def _log_windows(begin, end, step):
+    # (beginTime, endTime) pairs covering begin..end oldest first.  REDCap matches both ends inclusively to the
+    # minute, so each window stops a minute before the next one starts and no log entry is exported twice.
+    while begin <= end:
+        stop = min(begin + step, end + timedelta(minutes=1))
+        yield begin.strftime(LOG_TIME_FORMAT), (stop - timedelta(minutes=1)).strftime(LOG_TIME_FORMAT)
+        begin = stop
+
+
+def _fetch_log_shard(window):
+    with open_export('logging', {'beginTime': window[0], 'endTime': window[1]}) as r:
+        return r.status_code, b''.join(r.iter_content(1 << 16))
+
+
+def fetch_json(job, overrides=None):
+    """
+        Run JOBS[job] with format (and returnFormat, when the job sets one) switched to json and return the
+        parsed response, e.g. fetch_json('events') for a list of event dicts.
+        :raises requests.HTTPError: when REDCap returns an error status
+    """
+    overrides = dict(overrides or {}, format='json')
+    if 'returnFormat' in JOBS[job]:
+        overrides['returnFormat'] = 'json'
+
+    with open_export(job, overrides) as r:
+        r.raise_for_status()
+        return _json.loads(b''.join(r.iter_content(1 << 16)))
+
+
+def iter_rows(job, overrides=None):
+    """
+        Yield the rows of a CSV export as lists of str while the response is still downloading, so parsing
+        overlaps the transfer and memory stays at one row rather than the whole export.
+        :raises requests.HTTPError: when REDCap returns an error status
+    """
+    with open_export(job, overrides) as r:
+        r.raise_for_status()
+
+        for row in csv.reader(_lines(codecs.iterdecode(r.iter_content(1 << 16), 'utf-8'))):
+            yield row
+
+
+def _lines(chunks):
+    # Re-split decoded text chunks into lines that keep their '\n'.  csv.reader needs the line endings (iter_lines
+    # drops them) to preserve the line breaks inside quoted notes fields.
+    pending = ''
+    for text in chunks:
+        lines = (pending + text).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+
+    if pending:
+        yield pending
+
+
+def iter_report_rows(report_id):
+    """
+        Yield the rows, header first, of the REDCap custom report report_id.
+    """
+    return iter_rows('reports', {'report_id': str(report_id)})
+
+
+def save_export(job, export_dir, stamp, name=None, overrides=None):
+    """
+        Run one export and save the body to export_dir as [name]_DATA_[stamp].[format].
+        The logging job is fetched in shards like print_logging_export, unless overrides are given.
+        :return: tuple of the HTTP status code and either the saved path or the error returned by REDCap
+    """
+    if job == 'logging' and not overrides:
+        return _save_logging_export(os.path.join(export_dir, '{}_DATA_{}.csv'.format(name or job, stamp)))
+
+    with open_export(job, overrides) as r:
+        if r.status_code != 200:
+            return r.status_code, r.text
+
+        path = os.path.join(export_dir, '{}_DATA_{}.{}'.format(name or job, stamp, JOBS[job].get('format', 'raw')))
+        with open(path, 'wb') as f:
+            stream_to(r, f)
+
+    return r.status_code, path
+
+
+def _save_logging_export(path, shard_days=LOG_SHARD_DAYS):
+    with open(path, 'wb') as f:
+        for status, window, body in _log_shards(shard_days):
+            if status != 200:
+                break
+            f.write(body)
+        else:
+            return 200, path
+
+    # A partial log would look complete, so it is removed and the failing shard's error is returned instead
+    os.remove(path)
+    return status, '({} to {}) {}'.format(window[0], window[1], body.decode('utf-8', 'replace'))
+
+
+def load_report_ids(path):
+    if not os.path.exists(path):
+        return [JOBS['reports']['report_id']]
+
+    with open(path, newline='') as f:
+        return [row[0].strip() for row in csv.reader(f) if row and row[0].strip().isdigit()]
+
+
+def _tasks(jobs):
+    # (job, output name, field overrides) for each export to run; reports expand to one task per report_id
+    for job in jobs:
+        if job == 'reports':
+            for report_id in load_report_ids(config.get('report_ids_csv', 'ctrn_report_ids.csv')):
+                yield job, 'report_' + report_id, {'report_id': report_id}
+        else:
+            yield job, job, None
+
+
+def run(jobs):
+    export_dir = config.get('export_dir', 'rc_export')
+    os.makedirs(export_dir, exist_ok=True)
+    stamp = time.strftime('%Y-%m-%d_%H%M')
+    tasks = list(_tasks(jobs))
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        futures = [ex.submit(save_export, job, export_dir, stamp, name, overrides) for job, name, overrides in tasks]
+
+        for (job, name, overrides), future in zip(tasks, futures):
+            # A job that could not reach REDCap at all is reported like the others, without stopping the rest
+            try:
+                status, detail = future.result()
+            except Exception as e:
+                status, detail = 'failed', e
+
+            print('HTTP Status: {} ({}) {}'.format(status, name, detail))
+
+
+def main(argv):
+    jobs = argv or list(JOBS)
+    unknown = [job for job in jobs if job not in JOBS]
+
+    if unknown:
+        print('Unknown job(s): {}. Choose from: {}'.format(', '.join(unknown), ', '.join(JOBS)))
+        sys.exit(2)
+
+    run(jobs)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
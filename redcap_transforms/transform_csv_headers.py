@@ -8,12 +8,12 @@ import csv
 
 header = ["column_1", "column_2", "column_3"]
 
-with open('text.csv', 'r') as fp:
-    reader = csv.DictReader(fp, fieldnames=header)
-
-    # use newline='' to avoid adding new CR at end of line
-    with open('output.csv', 'w', newline='') as fh: 
-        writer = csv.DictWriter(fh, fieldnames=reader.fieldnames)
-        writer.writeheader()
-        header_mapping = next(reader)
-        writer.writerows(reader)
+# Rows are passed through untouched as lists, so no dict is built per row and the C writer loop copies them.
+# use newline='' to keep line breaks inside quoted fields and to avoid adding new CR at end of line
+with open('text.csv', 'r', newline='', buffering=1 << 20) as fp, \
+        open('output.csv', 'w', newline='', buffering=1 << 20) as fh:
+    reader = csv.reader(fp)
+    writer = csv.writer(fh)
+    next(reader, None)  # drop the old header
+    writer.writerow(header)
+    writer.writerows(reader)
@@ -1,8 +1,30 @@
 import os
+import struct
+import tempfile
 import unittest
-import requests
+import zlib
 
-from redcapy import Redcapy
+from urllib3 import encode_multipart_formdata
+from urllib3.fields import RequestField
+
+from redcapy import Redcapy, _MultipartBody
+from redcapy_exportcsv import Redcapy_exportcsv
+
+
+def _write_test_png(path, width=400, height=200):
+    """
+        Write a solid grey RGB PNG to path, so the file tests need no image download
+    """
+    def chunk(chunk_type, data):
+        return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+    rows = b''.join(b'\x00' + b'\x80' * 3 * width for _ in range(height))
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(rows)))
+        f.write(chunk(b'IEND', b''))
 
 
 class TestRedcapy(unittest.TestCase):
@@ -18,6 +40,15 @@ class TestRedcapy(unittest.TestCase):
         cls.rc = Redcapy(api_token=cls.redcap_token, redcap_url=cls.redcap_url)
         print('Using', cls.rc)
 
+        # One image file shared by the file import and delete tests
+        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as f:
+            cls.test_img = f.name
+        _write_test_png(cls.test_img)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        os.remove(cls.test_img)
+
     def test_correct_init(self):
         self.assertEqual(self.redcap_url, self.rc.redcap_url)
         self.assertEqual(self.redcap_token, self.rc._redcap_token)
@@ -37,6 +68,15 @@ class TestRedcapy(unittest.TestCase):
         self.assertRaises(ValueError, Redcapy, api_token=self.redcap_token, redcap_url='redcap.ucsf.edu')
         self.assertRaises(ValueError, Redcapy, api_token=self.redcap_token, redcap_url='http://redcap,')
 
+        # redcapy_exportcsv.py validates URLs with its own copy of the check
+        for redcap_class in (Redcapy, Redcapy_exportcsv):
+            for url in ('http://127.0.0.1:8765/api/', 'http://[::1]/api/', 'https://redcap.ucsf.edu:8443/api/'):
+                redcap_class(api_token=self.redcap_token, redcap_url=url)
+
+            for url in ('ftp://redcap.ucsf.edu/api/', 'http://redcap.ucsf.edu:99999/api/',
+                        'http://redcap.ucsf.edu:abc/api/'):
+                self.assertRaises(ValueError, redcap_class, api_token=self.redcap_token, redcap_url=url)
+
     # def test_export_events(self):
     #     self.fail()
     #
@@ -69,22 +109,11 @@ class TestRedcapy(unittest.TestCase):
         :return:
         """
         rc_export = self.rc.export_records()
-        record_ids = list(set(d['record_id'] for d in rc_export))
-        invalid_test_id = ''
-        valid_test_id = record_ids[0]
-
-        for rid in list(range(100000)):
-            if str(rid) not in record_ids:
-                invalid_test_id = str(rid)
-                break
-
-        response = requests.get('http://lorempixel.com/400/200', stream=True)
-        filename = 'test_img.png'
-
-        with open(filename, 'wb') as f:
-            f.write(response.content)
+        record_ids = {d['record_id'] for d in rc_export}
+        valid_test_id = next(iter(record_ids))
+        invalid_test_id = next((str(rid) for rid in range(100000) if str(rid) not in record_ids), '')
 
-        del response
+        filename = self.test_img
 
         # This is expected to fail and Redcapy will print an error as a result, which can be ignored
         rv = self.rc.import_file(
@@ -116,16 +145,10 @@ class TestRedcapy(unittest.TestCase):
             First, import a file, then delete it.  Results can be verified in the Redcap log.
         """
         rc_export = self.rc.export_records()
-        record_ids = sorted(list(set(d['record_id'] for d in rc_export)))
-        valid_test_id = record_ids[0]
+        valid_test_id = next(iter({d['record_id'] for d in rc_export}))
 
         if valid_test_id:
-            response = requests.get('http://lorempixel.com/400/200')
-            filename = 'test_img.png'
-
-            with open(filename, 'wb') as f:
-                f.write(response.content)
-            del response
+            filename = self.test_img
 
             field = 'exam_photo'
             event = '6_month_arm_2'
@@ -148,5 +171,43 @@ class TestRedcapy(unittest.TestCase):
             assert ValueError, 'No valid records found in test project'
 
 
+class TestMultipartBody(unittest.TestCase):
+    """
+        The streamed import_file body needs no Redcap server, so it is checked against urllib3's own encoder
+    """
+    def test_matches_encode_multipart_formdata(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(b'\x89PNG file contents')
+            f.seek(0)
+
+            fields = {'token': 'ABC', 'record': 1, 'event': None, 'records': ['1', '2'], 'returnFormat': 'json'}
+            body = _MultipartBody(fields, 'file', f, 'test_img.png', boundary='testboundary')
+            rendered = body.read()
+
+        # requests leaves out None values and sends one part per list item
+        expected_fields = [RequestField('token', 'ABC'), RequestField('record', '1'), RequestField('records', '1'),
+                           RequestField('records', '2'), RequestField('returnFormat', 'json'),
+                           RequestField('file', b'\x89PNG file contents', filename='test_img.png')]
+        for field in expected_fields:
+            field.make_multipart()
+        expected, content_type = encode_multipart_formdata(expected_fields, boundary='testboundary')
+
+        self.assertEqual(expected, rendered)
+        self.assertEqual(len(expected), len(body))
+        self.assertEqual(content_type, body.content_type)
+        self.assertNotIn(b'name="event"', rendered)
+
+    def test_read_in_chunks(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(b'x' * 1000)
+            f.seek(0)
+
+            body = _MultipartBody({'token': 'ABC'}, 'file', f, 'a.txt', boundary='b')
+            chunks = list(iter(lambda: body.read(100), b''))
+
+        self.assertEqual(len(body), sum(len(chunk) for chunk in chunks))
+        self.assertTrue(all(len(chunk) == 100 for chunk in chunks[:-1]))
+
+
 if __name__ == '__main__':
     unittest.main()